@@ -1,17 +1,31 @@
 """Telegram bot handlers and commands."""
-import json
+import asyncio
+import functools
+import hashlib
+import html
 import logging
 import random
+import re
+import threading
+import time
+from datetime import date
+from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+try:
+    import lxml  # noqa: F401  (only checked for availability; used through BeautifulSoup)
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler, 
+    AIORateLimiter, Application, CommandHandler, CallbackQueryHandler, 
     ContextTypes, MessageHandler, filters, ConversationHandler
 )
-from telegram.constants import ParseMode
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import BadRequest
 import config
 from database import get_db
-from findsgjobs_client import get_findsgjobs_client
+from findsgjobs_client import get_findsgjobs_client, job_list_field
 from keyword_manager import get_keyword_manager
 
 # Configure logging
@@ -24,6 +38,204 @@ logger = logging.getLogger(__name__)
 # Conversation states
 WAITING_FOR_SEARCH_QUERY, WAITING_FOR_TIME, WAITING_FOR_MANUAL_KEYWORD, WAITING_FOR_MIN_SALARY = range(4)
 
+# HH:MM (or H:M) 24-hour time accepted by /set_time
+_TIME_INPUT_RE = re.compile(r'([01]?\d|2[0-3]):([0-5]?\d)')
+# Whole-number SGD amount for /set_min_salary (0 clears the filter)
+_SALARY_INPUT_RE = re.compile(r'\d+')
+
+# Job message templates (built once, filled per job)
+DESCRIPTION_PREVIEW_CHARS = 200
+# How long a registered user skips the users-table check (clear_database.py can delete users under a running bot)
+_KNOWN_USER_TTL_SECONDS = 300
+# Descriptions are only read for their text, so only text nodes need to be built
+_TEXT_ONLY = SoupStrainer(string=True)
+# A job message is head + optional explanation + footer; optional sections are filled with '' when absent
+_HEAD_FMT = "*{title}*\n🏢 {company}\n{salary}{description}"
+_FOOTER_FMT = "{categories}{employment}{mrt}{background}{skills}"
+_SALARY_RANGE_FMT = "\n💰 ${:,.0f} - ${:,.0f}"
+_SALARY_FROM_FMT = "\n💰 From ${:,.0f}"
+
+# HTML texts for /start (filled with the user's first name) and /help
+WELCOME_TEMPLATE = (
+    "👋 Welcome to Job Bot, {first_name}!\n\n"
+    "I'll help you find personalized job recommendations based on your preferences.\n\n"
+    "<b>How it works:</b>\n"
+    "• Use /search or just type keywords to find specific jobs\n"
+    "• Like 👍 each job to help refine recommendations\n"
+    "• I'll learn what you like and improve over time!\n\n"
+    "• Use /more - Get more personalized recommendations\n"
+    "📢 <b>Notifications:</b> Daily digest notifications are enabled by default. Use /toggle_notifications to turn them off.\n\n"
+    "• Each digest may include a short, positive encouragement message and lucky number to brighten your day."
+)
+
+HELP_TEXT = (
+    "🤖 <b>Job Bot Commands</b>\n\n"
+    "📋 <b>Job Discovery:</b>\n"
+    "/more - Get 2-3 personalized recommendations\n"
+    "/search - Search for specific jobs\n\n"
+    "⚙️ <b>Profile &amp; Settings:</b>\n"
+    "/view_keywords - View your adaptive keywords\n"
+    "/add_keyword - Add a manual keyword (positive only)\n"
+    "/keyword_management - Manage and remove keywords (delete, clear)\n"
+    "/set_time - Set daily notification time (30-min slots)\n"
+    "/toggle_notifications - Turn daily digest on/off\n\n"
+    "✨ <b>Daily Encouragements:</b> Each digest may include a short positive message generated to brighten your day.\n\n"
+    "❓ <b>Other:</b>\n"
+    "/help - Show this help message\n"
+    "/start - Reset welcome message\n\n"
+    "💡 <b>Tip:</b> Type keywords or use /search to find jobs. Like 👍 jobs to improve recommendations!"
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def render_description(raw_desc: str) -> str:
+    """Return a plain-text preview of a job description, preserving line breaks.
+
+    Cached on the description text: the same posting is rendered for every digest user and
+    on repeated /more calls, and keying on the text (not job_id) means edited postings re-render.
+    """
+    if not raw_desc:
+        return ''
+    if '<' in raw_desc or '&' in raw_desc:
+        # Parse HTML (tags/entities) and put each text block on its own line. The strainer would
+        # keep <script>/<style> bodies as text, so those (rare) descriptions get a full parse.
+        lowered = raw_desc.lower()
+        parse_only = None if '<script' in lowered or '<style' in lowered else _TEXT_ONLY
+        soup = BeautifulSoup(raw_desc, HTML_PARSER, parse_only=parse_only)
+        plain = soup.get_text(separator='\n', strip=True)
+    else:
+        # Plain text: nothing to parse, same result as get_text(strip=True)
+        plain = raw_desc.strip()
+    if len(plain) > DESCRIPTION_PREVIEW_CHARS:
+        return plain[:DESCRIPTION_PREVIEW_CHARS] + '...'
+    return plain
+
+
+
+@functools.lru_cache(maxsize=1024)
+def _job_message_parts(title, company, salary_min, salary_max, raw_desc, categories, employment_types,
+                       work_arrangement, mrt, exp, edu, skills) -> tuple:
+    """Build the job-dependent parts of a job message: (head, footer).
+
+    The per-user explanation goes between them. Cached on the job's display fields so a job
+    shown to many users (daily digest) or repeatedly (/more) is only formatted once.
+    """
+    description = render_description(raw_desc)
+    
+    # Salary info
+    if salary_min and salary_max:
+        salary = _SALARY_RANGE_FMT.format(salary_min, salary_max)
+    elif salary_min:
+        salary = _SALARY_FROM_FMT.format(salary_min)
+    else:
+        salary = ''
+    head = _HEAD_FMT.format(
+        title=title, company=company, salary=salary,
+        description=f"\n\n{description}" if description else '',
+    )
+    
+    # Additional details as a footer: categories, employment, MRT, experience/education, skills (abbreviated)
+    employment = ''
+    if employment_types or work_arrangement:
+        et = ', '.join(employment_types[:2]) if employment_types else ''
+        wa = f" • {work_arrangement}" if work_arrangement else ''
+        employment = f"\n💼 {et}{wa}"
+    mrt_line = ''
+    if mrt:
+        more = f" +{len(mrt) - 3} more" if len(mrt) > 3 else ''
+        mrt_line = f"\n🚇 {', '.join(mrt[:3])}{more}"
+    if exp and edu:
+        background = f"\n📋 Exp: {exp} • Edu: {edu}"
+    elif exp:
+        background = f"\n📋 Exp: {exp}"
+    elif edu:
+        background = f"\n📋 Edu: {edu}"
+    else:
+        background = ''
+    skills_line = ''
+    if skills:
+        more = f" +{len(skills) - 5} more" if len(skills) > 5 else ''
+        skills_line = f"\n🔧 {', '.join(skills[:5])}{more}"
+    footer = _FOOTER_FMT.format(
+        categories=f"\n\n📂 {', '.join(categories[:2])}" if categories else '',
+        employment=employment, mrt=mrt_line, background=background, skills=skills_line,
+    )
+    return head, footer
+
+
+@functools.lru_cache(maxsize=1024)
+def _job_keyboard(job_id: str, job_url: str) -> InlineKeyboardMarkup:
+    """Build the Like / View Job keyboard for a job.
+
+    The markup only depends on the job, and PTB telegram objects are immutable, so one instance
+    is shared by every user the job is sent to.
+    """
+    keyboard = [
+        [
+            InlineKeyboardButton("👍 Like", callback_data=f"like:{job_id}"),
+        ],
+        [
+            InlineKeyboardButton("🔗 View Job", url=job_url),
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+# Command menu registered with Telegram on startup
+BOT_COMMANDS = (
+    BotCommand("start", "Start the bot and get welcome message"),
+    BotCommand("more", "Get personalized job recommendations"),
+    BotCommand("search", "Search for jobs with specific keywords"),
+    BotCommand("view_keywords", "View your keyword profile"),
+    BotCommand("add_keyword", "Add a manual keyword to your profile"),
+    BotCommand("keyword_management", "Manage and remove keywords"),
+    BotCommand("set_time", "Set daily notification time"),
+    BotCommand("set_min_salary", "Set minimum monthly salary filter (SGD)"),
+    BotCommand("toggle_notifications", "Turn daily digest on/off"),
+    BotCommand("digest_now", "Receive an immediate digest (testing)"),
+    BotCommand("reset_profile", "Reset your profile (keywords/history)"),
+    BotCommand("help", "Show help and available commands"),
+)
+# daily_cache key holding a digest of the last command menu sent to Telegram
+_BOT_COMMANDS_CACHE_KEY = 'bot_commands_sha256'
+
+
+def _bot_commands_digest(bot_id: int) -> str:
+    """SHA-256 of the bot id and command menu, to detect whether set_my_commands is needed."""
+    menu = "\n".join(f"{c.command}\t{c.description}" for c in BOT_COMMANDS)
+    return hashlib.sha256(f"{bot_id}\n{menu}".encode()).hexdigest()
+
+# Static inline keyboards for /reset_profile and the keyword management (km:) menu, built once
+_RESET_PROFILE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Reset Everything", callback_data="reset:confirm:all"), InlineKeyboardButton("❌ Cancel", callback_data="reset:cancel")],
+    [InlineKeyboardButton("🔧 Reset Keywords Only", callback_data="reset:confirm:keywords"), InlineKeyboardButton("📊 Reset History Only", callback_data="reset:confirm:history")]
+])
+_KM_MENU_ROWS = [
+    [InlineKeyboardButton("🗑️ Remove One Keyword", callback_data="km:remove_one")],
+    [InlineKeyboardButton("🤖 Clear All Auto Keywords", callback_data="km:clear_auto")],
+    [InlineKeyboardButton("✍️ Clear All Manual Keywords", callback_data="km:clear_manual")],
+    [InlineKeyboardButton("🧹 Clear All Keywords", callback_data="km:clear_all")],
+]
+# /keyword_management opens the menu with a "Back" button; returning to it from a callback shows "Cancel"
+_KM_COMMAND_MARKUP = InlineKeyboardMarkup(_KM_MENU_ROWS + [[InlineKeyboardButton("🔙 Back", callback_data="km:cancel")]])
+_KM_MENU_MARKUP = InlineKeyboardMarkup(_KM_MENU_ROWS + [[InlineKeyboardButton("❌ Cancel", callback_data="km:cancel")]])
+_KM_BACK_TO_MENU_ROW = [InlineKeyboardButton("🔙 Back to menu", callback_data="km:menu")]
+_KM_CLEAR_AUTO_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Yes, clear auto keywords", callback_data="km:clear_auto_confirm"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]
+])
+_KM_CLEAR_MANUAL_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Yes, clear manual keywords", callback_data="km:clear_manual_confirm"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]
+])
+_KM_CLEAR_ALL_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Yes, clear all keywords", callback_data="km:clear_all_confirm"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]
+])
+
+# like/dislike -> (footer appended to the job card, short reply when the card can't be edited)
+_FEEDBACK_MESSAGES = {
+    'like': ("\n\n👍 *Liked!* Your profile has been updated.", "👍 Job liked! Your profile has been updated."),
+    'dislike': ("\n\n👎 *Disliked!* Your profile has been updated.", "👎 Job disliked! Your profile has been updated."),
+}
+
 
 class JobBot:
     """Telegram Job Bot."""
@@ -33,6 +245,32 @@ class JobBot:
         self.db = get_db()
         self.findsgjobs = get_findsgjobs_client()
         self.keyword_manager = get_keyword_manager()
+        # Callback dispatch: data prefix -> handler, then "km:<cmd>" -> handler
+        self._callback_handlers = {
+            'reset': self._reset_callback,
+            'km': self._km_callback,
+            'like': self._feedback_callback,
+            'dislike': self._feedback_callback,
+        }
+        # Strong references to in-flight callback query answers (the loop only keeps weak ones)
+        self._pending_answers = set()
+        self._km_handlers = {
+            'menu': self._km_menu,
+            'cancel': self._km_menu,
+            'remove_one': self._km_remove_one,
+            'del': self._km_delete,
+            'del_confirm': self._km_delete_confirm,
+            'clear_auto': self._km_clear_auto,
+            'clear_auto_confirm': self._km_clear_auto_confirm,
+            'clear_manual': self._km_clear_manual,
+            'clear_manual_confirm': self._km_clear_manual_confirm,
+            'clear_all': self._km_clear_all,
+            'clear_all_confirm': self._km_clear_all_confirm,
+        }
+        # user_id -> monotonic time until which the user is assumed to still be registered
+        self._known_users = {}
+        # user_id -> (expires_at, unsent (job, score, matched) rows) from the last /more ranking
+        self._ranking_cache = {}
         # Clear existing negative keywords from DB on startup (migration)
         try:
             self.db.clear_all_negative_keywords()
@@ -41,305 +279,258 @@ class JobBot:
     
     def format_job_message(self, job: dict, explanation: str = None) -> str:
         """Format job as Telegram message."""
-        title = job.get('title', 'Unknown')
-        company = job.get('company', {})
+        get = job.get
+        company = get('company', {})
         if isinstance(company, dict):
             company = company.get('display_name', 'Unknown')
-        
-        location = job.get('location', {})
-        if isinstance(location, dict):
-            location = location.get('display_name', 'Singapore')
-
-        # Parse HTML description and preserve line breaks
-        raw_desc = job.get('description') or ''
-        description = ''
-        if raw_desc:
-            soup = BeautifulSoup(raw_desc, 'html.parser')
-            plain = soup.get_text(separator='\n', strip=True)
-            if plain:
-                description = (plain[:200] + '...') if len(plain) > 200 else plain
-        
-        # Salary info
-        salary_min = job.get('salary_min')
-        salary_max = job.get('salary_max')
-        salary_str = ""
-        if salary_min and salary_max:
-            salary_str = f"\n💰 ${salary_min:,.0f} - ${salary_max:,.0f}"
-        elif salary_min:
-            salary_str = f"\n💰 From ${salary_min:,.0f}"
-        
-        message = f"*{title}*\n"
-        message += f"🏢 {company}\n"
-        # message += f"📍 {location}"
-        message += salary_str
-        
-        if description:
-            message += f"\n\n{description}"
-        
+        head, footer = _job_message_parts(
+            get('title', 'Unknown'), company, get('salary_min'), get('salary_max'), get('description') or '',
+            job_list_field(job, 'category'), job_list_field(job, 'employment_type'), get('work_arrangement'),
+            job_list_field(job, 'mrt_stations'), get('experience_required'), get('education_required'),
+            job_list_field(job, 'skills'),
+        )
         if explanation:
-            message += f"\n\n💡 _{explanation}_"
-        # Additional details: categories, employment, MRT, skills (abbreviated)
-        # We append as a footer to the message
-        # Categories and employment types
-        categories = json.loads(job.get('category_json') or '[]')
-        employment_types = json.loads(job.get('employment_type_json') or '[]')
-        if categories:
-            message += f"\n\n📂 {', '.join(categories[:2])}"
-        if employment_types or job.get('work_arrangement'):
-            et = ', '.join(employment_types[:2]) if employment_types else ''
-            wa = f" • {job.get('work_arrangement')}" if job.get('work_arrangement') else ''
-            message += f"\n💼 {et}{wa}"
-        # MRT stations
-        mrt = json.loads(job.get('mrt_stations_json') or '[]')
-        if mrt:
-            part = ', '.join(mrt[:3])
-            if len(mrt) > 3:
-                part += f" +{len(mrt) - 3} more"
-            message += f"\n🚇 {part}"
-        # Experience/Education
-        exp = job.get('experience_required')
-        edu = job.get('education_required')
-        if exp or edu:
-            parts = []
-            if exp:
-                parts.append(f"Exp: {exp}")
-            if edu:
-                parts.append(f"Edu: {edu}")
-            message += f"\n📋 {' • '.join(parts)}"
-        # Skills
-        skills = json.loads(job.get('skills_json') or '[]')
-        if skills:
-            s_text = ', '.join(skills[:5])
-            if len(skills) > 5:
-                s_text += f" +{len(skills)-5} more"
-            message += f"\n🔧 {s_text}"
-        return message
+            return f"{head}\n\n💡 _{explanation}_{footer}"
+        return head + footer
     
-    def create_job_keyboard(self, job_id: str) -> InlineKeyboardMarkup:
-        """Create inline keyboard for job."""
-        # Prefer stored 'url' in DB if available
-        job_url = None
-        try:
-            j = self.db.get_job(job_id)
-            if j and j.get('url'):
-                job_url = j.get('url')
-        except Exception:
-            job_url = None
+    def build_job_cards(self, items: list) -> list:
+        """Turn (job, explanation) pairs into (text, keyboard) cards for send_job_cards.
+
+        Uncached descriptions are HTML-parsed here, so async callers run this in a worker thread.
+        """
+        return [
+            (self.format_job_message(job, explanation), self.create_job_keyboard(job.get('id'), job.get('url')))
+            for job, explanation in items
+        ]
+    
+    @staticmethod
+    def search_status_text(deleted_keywords: list, manual_failed: list, used_keyword: str, used_recent: bool) -> str:
+        """Combine the notices from search_with_keyword_retry into a single message ('' if none)."""
+        lines = []
+        if deleted_keywords:
+            lines.append(f"🔄 Removed keyword(s) with no results: {', '.join(deleted_keywords)}. Trying alternatives...")
+        if manual_failed:
+            lines.append(f"⚠️ Your manual keyword(s) returned no results and were kept: {', '.join(manual_failed)}")
+        if used_keyword:
+            lines.append(f"🔍 Searching with keyword: *{used_keyword}*")
+        elif used_recent:
+            lines.append("🔍 Searching recent jobs (no keywords available or after retries)")
+        return "\n".join(lines)
+
+    def create_job_keyboard(self, job_id: str, job_url: Optional[str] = None) -> InlineKeyboardMarkup:
+        """Create inline keyboard for job; callers pass the job's url from the dict they already hold."""
         if not job_url:
             job_url = f"https://www.findsgjobs.com/job/{job_id}"
+        return _job_keyboard(job_id, job_url)
+
+    @staticmethod
+    async def _db(fn, *args, **kwargs):
+        """Run a blocking Database call in a worker thread so the event loop keeps serving other chats."""
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def record_shown_jobs(self, user_id: int, jobs: list, tag: str):
+        """Cache jobs and log them as shown to the user, in one commit.
 
-        keyboard = [
-            [
-                InlineKeyboardButton("👍 Like", callback_data=f"like:{job_id}"),
-            ],
-            [
-                InlineKeyboardButton("🔗 View Job", url=job_url),
-            ]
+        Blocking; called in a worker thread. A failed upsert is logged and the jobs are still logged as shown.
+        """
+        with self.db.transaction():
+            try:
+                self.db.upsert_jobs(jobs)
+            except Exception as e:
+                logger.warning("[%s] Failed to upsert jobs for user %s: %s", tag, user_id, e)
+            self.db.log_interactions(user_id, [job.get('id') for job in jobs], 'shown')
+    
+    async def send_job_cards(self, message, cards: list):
+        """Reply to `message` with job cards given as (text, keyboard) pairs.
+
+        The top-ranked card is sent first so it stays at the head of the chat; the rest are
+        posted concurrently. A failed card is logged and does not stop the others.
+        """
+        if not cards:
+            return
+        sends = [
+            message.reply_text(text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
+            for text, keyboard in cards
         ]
-        return InlineKeyboardMarkup(keyboard)
+        results = await asyncio.gather(sends[0], return_exceptions=True)
+        results += await asyncio.gather(*sends[1:], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("[SEND] Failed to send job card to chat %s: %s", message.chat_id, result)
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
         user = update.effective_user
         
         # Register user if new
-        existing = self.db.get_user(user.id)
-        if not existing:
-            self.db.create_user(user.id, user.username)
-        
-        welcome_msg = (
-            f"👋 Welcome to Job Bot, {user.first_name}!\n\n"
-            "I'll help you find personalized job recommendations based on your preferences.\n\n"
-            "<b>How it works:</b>\n"
-            "• Use /search or just type keywords to find specific jobs\n"
-            "• Like 👍 each job to help refine recommendations\n"
-            "• I'll learn what you like and improve over time!\n\n"
-            "• Use /more - Get more personalized recommendations\n"
-            "📢 <b>Notifications:</b> Daily digest notifications are enabled by default. Use /toggle_notifications to turn them off.\n\n"
-            "• Each digest may include a short, positive encouragement message and lucky number to brighten your day."
-        )
-
+        if not self._is_known_user(user.id):
+            existing = await self._db(self.db.get_user, user.id)
+            if not existing:
+                await self._db(self.db.create_user, user.id, user.username)
+            self._mark_known_user(user.id)
         
+        # The name goes into an HTML message, so escape it (e.g. a "<" would make Telegram reject it)
+        welcome_msg = WELCOME_TEMPLATE.format(first_name=html.escape(user.first_name or ''))
         await update.message.reply_text(welcome_msg, parse_mode=ParseMode.HTML)
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command."""
-        help_text = (
-            "🤖 <b>Job Bot Commands</b>\n\n"
-            "📋 <b>Job Discovery:</b>\n"
-            "/more - Get 2-3 personalized recommendations\n"
-            "/search - Search for specific jobs\n\n"
-            "⚙️ <b>Profile &amp; Settings:</b>\n"
-            "/view_keywords - View your adaptive keywords\n"
-            "/add_keyword - Add a manual keyword (positive only)\n"
-            "/keyword_management - Manage and remove keywords (delete, clear)\n"
-            "/set_time - Set daily notification time (30-min slots)\n"
-            "/toggle_notifications - Turn daily digest on/off\n\n"
-            "✨ <b>Daily Encouragements:</b> Each digest may include a short positive message generated to brighten your day.\n\n"
-            "❓ <b>Other:</b>\n"
-            "/help - Show this help message\n"
-            "/start - Reset welcome message\n\n"
-            "💡 <b>Tip:</b> Type keywords or use /search to find jobs. Like 👍 jobs to improve recommendations!"
-        )
-        await update.message.reply_text(help_text, parse_mode=ParseMode.HTML)
+        await update.message.reply_text(HELP_TEXT, parse_mode=ParseMode.HTML)
     
     async def more_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /more command - get real-time recommendations."""
+        await self._send_recommendations(
+            update, context, tag='MORE', limit=config.REALTIME_MAX,
+            intro="🔍 Finding jobs for you...",
+            no_jobs_text="😕 No jobs found right now. Try again later or use /search to find specific jobs.",
+            no_matches_text="You've seen all recent matches! Try /search or check back later.",
+            reuse_ranking=True,
+        )
+
+    async def digest_now(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Send a one-off digest to the calling user for testing."""
+        await self._send_recommendations(
+            update, context, tag='DIGEST_NOW', limit=config.DAILY_COUNT,
+            header="📬 *Your Immediate Job Digest*\nHere are your top matches:\n",
+            no_jobs_text="No new jobs found at the moment. Try again later.",
+            no_matches_text="No new jobs found at the moment. Try again later.",
+        )
+
+    def _is_known_user(self, user_id: int) -> bool:
+        expires_at = self._known_users.get(user_id)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def _mark_known_user(self, user_id: int):
+        now = time.monotonic()
+        # Drop expired entries on insert so users who stop chatting don't pile up
+        self._known_users = {uid: exp for uid, exp in self._known_users.items() if exp > now}
+        self._known_users[user_id] = now + _KNOWN_USER_TTL_SECONDS
+
+    def _cache_ranking(self, user_id: int, expires_at: float, ranked: list):
+        """Keep the unsent rest of a ranking for /more, dropping expired entries of other users."""
+        now = time.monotonic()
+        self._ranking_cache = {uid: entry for uid, entry in self._ranking_cache.items() if entry[0] > now}
+        self._ranking_cache[user_id] = (expires_at, ranked)
+
+    def _invalidate_ranking(self, user_id: int):
+        """Drop the user's cached /more ranking after a change to their keywords, salary filter or history."""
+        self._ranking_cache.pop(user_id, None)
+
+    def _pop_cached_ranking(self, user_id: int, limit: int) -> Optional[tuple]:
+        """Take the user's cached (expires_at, ranked) entry if still fresh with at least `limit` jobs left."""
+        entry = self._ranking_cache.pop(user_id, None)
+        if entry is None or entry[0] <= time.monotonic() or len(entry[1]) < limit:
+            return None
+        return entry
+
+    async def _send_recommendations(self, update: Update, context: ContextTypes.DEFAULT_TYPE, tag: str, limit: int,
+                                    no_jobs_text: str, no_matches_text: str,
+                                    intro: Optional[str] = None, header: Optional[str] = None,
+                                    reuse_ranking: bool = False):
+        """Shared /more and /digest_now flow: search with a preferred keyword, rank, send the top `limit` jobs.
+
+        `intro` is sent once the user is known to be registered, `header` right before the job cards.
+        With `reuse_ranking`, the unsent rest of the ranking is kept for RANKING_CACHE_TTL_SECONDS and
+        the next call sends from it without searching again.
+        """
         user_id = update.effective_user.id
-        logger.info(f"[MORE] User {user_id} requested more jobs")
+        logger.info("[%s] User %s requested jobs", tag, user_id)
         
-        # Ensure user exists
-        if not self.db.get_user(user_id):
-            logger.warning(f"[MORE] User {user_id} not registered")
-            await update.message.reply_text(
-                "Please use /start first to register!",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
-        
-        await update.message.reply_text("🔍 Finding jobs for you...")
+        # Ensure user exists (keywords come back with the user row); known users skip the user lookup
+        # and get the intro right away, while their keywords are read and the search runs
+        intro_sent = None
+        if self._is_known_user(user_id):
+            if intro:
+                intro_sent = asyncio.create_task(update.message.reply_text(intro))
+            keywords = await self._db(self.db.get_user_keywords, user_id, top_k=config.TOP_K)
+        else:
+            user, keywords, _ = await self._db(self.db.get_user_profile, user_id, top_k=config.TOP_K)
+            if not user:
+                logger.warning("[%s] User %s not registered", tag, user_id)
+                await update.message.reply_text(
+                    "Please use /start first to register!",
+                    parse_mode=ParseMode.MARKDOWN
+                )
+                return
+            self._mark_known_user(user_id)
+            if intro:
+                intro_sent = asyncio.create_task(update.message.reply_text(intro))
         
-        # Get user keywords
-        keywords = self.db.get_user_keywords(user_id, top_k=config.TOP_K)
-        keyword_list = [kw['keyword'] for kw in keywords if not kw['is_negative']]
-        logger.info(f"[MORE] User {user_id} has {len(keywords)} total keywords, {len(keyword_list)} positive: {keyword_list}")
+        # Reuse the rest of a recent ranking (e.g. repeated /more) instead of searching again
+        cached = self._pop_cached_ranking(user_id, limit) if reuse_ranking else None
+        if cached is not None:
+            expires_at, ranked = cached
+            logger.info("[%s] Reusing %d ranked jobs for user %s", tag, len(ranked), user_id)
+            if intro_sent:
+                await intro_sent
+        else:
+            expires_at = time.monotonic() + config.RANKING_CACHE_TTL_SECONDS
+            keyword_list = [kw['keyword'] for kw in keywords if not kw['is_negative']]
+            logger.info("[%s] User %s has %d total keywords, %d positive: %s", tag, user_id, len(keywords), len(keyword_list), keyword_list)
         
-        # Pick a random preferred keyword to try first (if any) and attempt search with retries
-        preferred_keyword = random.choice(keyword_list) if keyword_list else None
-        jobs, used_keyword, deleted_keywords, manual_failed, used_recent = self.keyword_manager.search_with_keyword_retry(
-            user_id=user_id, findsg_client=self.findsgjobs, context=context, limit=100, preferred_keyword=preferred_keyword
-        )
-
-        # Inform user about keyword deletions or manual failures
-        if deleted_keywords:
-            await update.message.reply_text(
-                f"🔄 Removed keyword(s) with no results: {', '.join(deleted_keywords)}. Trying alternatives...",
-                parse_mode=ParseMode.MARKDOWN
-            )
-        if manual_failed:
-            await update.message.reply_text(
-                f"⚠️ Your manual keyword(s) returned no results and were kept: {', '.join(manual_failed)}",
-                parse_mode=ParseMode.MARKDOWN
+            # Pick a random preferred keyword to try first (if any) and attempt search with retries
+            preferred_keyword = random.choice(keyword_list) if keyword_list else None
+            jobs, used_keyword, deleted_keywords, manual_failed, used_recent = await self.findsgjobs.run_blocking(
+                self.keyword_manager.search_with_keyword_retry,
+                user_id=user_id, findsg_client=self.findsgjobs, context=context, limit=100, preferred_keyword=preferred_keyword
             )
+            # Everything below replies after the intro
+            if intro_sent:
+                await intro_sent
 
-        # Inform which source is used
-        if used_keyword:
-            logger.info(f"[MORE] Using keyword: {used_keyword}")
-            await update.message.reply_text(f"🔍 Searching with keyword: *{used_keyword}*", parse_mode=ParseMode.MARKDOWN)
-        elif used_recent:
-            logger.info(f"[MORE] No usable keywords, fetching recent jobs")
-            await update.message.reply_text("🔍 Searching recent jobs (no keywords available or after retries)", parse_mode=ParseMode.MARKDOWN)
+            # Inform which source is used
+            if used_keyword:
+                logger.info("[%s] Using keyword: %s", tag, used_keyword)
+            elif used_recent:
+                logger.info("[%s] No usable keywords, fetching recent jobs", tag)
+            # Keyword deletions, manual failures and the search source go out as one message
+            status = self.search_status_text(deleted_keywords, manual_failed, used_keyword, used_recent)
+            if status:
+                await update.message.reply_text(status, parse_mode=ParseMode.MARKDOWN)
         
-        logger.info(f"[MORE] Fetched {len(jobs)} jobs from FindSGJobs")
+            logger.info("[%s] Fetched %d jobs from FindSGJobs", tag, len(jobs))
         
-        if not jobs:
-            logger.warning(f"[MORE] No jobs returned from FindSGJobs for user {user_id} after retries")
-            await update.message.reply_text(
-                "😕 No jobs found right now. Try again later or use /search to find specific jobs.",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
+            if not jobs:
+                logger.warning("[%s] No jobs returned from FindSGJobs for user %s after retries", tag, user_id)
+                await update.message.reply_text(no_jobs_text, parse_mode=ParseMode.MARKDOWN)
+                return
         
-        # Rank jobs
-        logger.info(f"[MORE] Ranking {len(jobs)} jobs for user {user_id}")
-        ranked = self.keyword_manager.rank_jobs(jobs, user_id, exclude_recent=True)
-        logger.info(f"[MORE] After ranking and filtering, {len(ranked)} jobs remain")
+            # Rank jobs
+            logger.info("[%s] Ranking %d jobs for user %s", tag, len(jobs), user_id)
+            # Scoring is CPU-bound; run it in a worker thread so other updates keep being served
+            ranked = await asyncio.to_thread(self.keyword_manager.rank_jobs, jobs, user_id, exclude_recent=True)
+            logger.info("[%s] After ranking and filtering, %d jobs remain", tag, len(ranked))
         
-        if not ranked:
-            logger.warning(f"[MORE] No jobs left after ranking/filtering for user {user_id}")
-            await update.message.reply_text(
-                "You've seen all recent matches! Try /search or check back later.",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
+            if not ranked:
+                logger.warning("[%s] No jobs left after ranking/filtering for user %s", tag, user_id)
+                await update.message.reply_text(no_matches_text, parse_mode=ParseMode.MARKDOWN)
+                return
         
-        # Send top 2-3 jobs
-        count = min(len(ranked), config.REALTIME_MAX)
-        logger.info(f"[MORE] Sending {count} jobs to user {user_id}")
+        if header:
+            await update.message.reply_text(header, parse_mode=ParseMode.MARKDOWN)
         
-        for idx, (job, score, matched) in enumerate(ranked[:count], 1):
-            # Cache job in database
-            self.db.upsert_job(job)
-            job_id = job.get('id')
-            
-            logger.info(f"[MORE] Job {idx}/{count}: {job_id} - {job.get('title')} - Score: {score:.2f}")
-            
-            # Log as shown
-            self.db.log_interaction(user_id, job_id, 'shown')
-            
-            # Format and send (do not include raw numeric score; show matched keywords only)
-            explanation = f"Matched: {', '.join(matched[:3])}" if matched else None
-            
-            message = self.format_job_message(job, explanation)
-            keyboard = self.create_job_keyboard(job_id)
+        count = min(len(ranked), limit)
+        logger.info("[%s] Sending %d jobs to user %s", tag, count, user_id)
+        
+        top = ranked[:count]
+        if reuse_ranking and config.RANKING_CACHE_TTL_SECONDS > 0 and len(ranked) > count:
+            self._cache_ranking(user_id, expires_at, ranked[count:])
+        # Cache jobs and log them as shown in a worker thread while the cards are built
+        record = asyncio.create_task(asyncio.to_thread(self.record_shown_jobs, user_id, [job for job, _, _ in top], tag))
+        
+        items = []
+        for idx, (job, score, matched) in enumerate(top, 1):
+            logger.info("[%s] Job %d/%d: %s - %s - Score: %.2f", tag, idx, count, job.get('id'), job.get('title'), score)
             
-            await update.message.reply_text(
-                message,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
-            )
-
-    async def digest_now(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Send a one-off digest to the calling user for testing."""
-        user_id = update.effective_user.id
-        logger.info(f"[DIGEST_NOW] User {user_id} requested an immediate digest")
-
-        # Ensure user exists
-        if not self.db.get_user(user_id):
-            await update.message.reply_text("Please use /start first to register!", parse_mode=ParseMode.MARKDOWN)
-            return
-
-        # Get user's keywords to pick a preferred one
-        keywords = self.db.get_user_keywords(user_id, top_k=config.TOP_K)
-        keyword_list = [kw['keyword'] for kw in keywords if not kw['is_negative']]
-        logger.info(f"[DIGEST_NOW] User {user_id} has {len(keywords)} total keywords, {len(keyword_list)} positive: {keyword_list}")
-
-        # Reuse the logic from more_command but show DAILY_COUNT jobs with retry/deletion
-        # For digest_now: pick a random preferred keyword and attempt search with retries
-        preferred_keyword = random.choice(keyword_list) if keyword_list else None
-        jobs, used_keyword, deleted_keywords, manual_failed, used_recent = self.keyword_manager.search_with_keyword_retry(
-            user_id=user_id, findsg_client=self.findsgjobs, context=context, limit=100, preferred_keyword=preferred_keyword
-        )
-
-        # Inform user about keyword deletions or manual failures
-        if deleted_keywords:
-            await update.message.reply_text(
-                f"🔄 Removed keyword(s) with no results: {', '.join(deleted_keywords)}. Trying alternatives...",
-                parse_mode=ParseMode.MARKDOWN
-            )
-        if manual_failed:
-            await update.message.reply_text(
-                f"⚠️ Your manual keyword(s) returned no results and were kept: {', '.join(manual_failed)}",
-                parse_mode=ParseMode.MARKDOWN
-            )
-        if used_keyword:
-            await update.message.reply_text(f"🔍 Searching with keyword: *{used_keyword}*", parse_mode=ParseMode.MARKDOWN)
-        elif used_recent:
-            await update.message.reply_text("🔍 Searching recent jobs (no keywords available or after retries)", parse_mode=ParseMode.MARKDOWN)
-
-        ranked = self.keyword_manager.rank_jobs(jobs, user_id, exclude_recent=True)
-        if not ranked:
-            await update.message.reply_text("No new jobs found at the moment. Try again later.")
-            return
-
-        header = "📬 *Your Immediate Job Digest*\nHere are your top matches:\n"
-        await update.message.reply_text(header, parse_mode=ParseMode.MARKDOWN)
-
-        count = min(len(ranked), config.DAILY_COUNT)
-        for job, score, matched in ranked[:count]:
-            try:
-                self.db.upsert_job(job)
-            except Exception as e:
-                logger.warning(f"Failed to upsert job {job.get('id')}: {e}")
-            job_id = job.get('id')
-            self.db.log_interaction(user_id, job_id, 'shown')
-            explanation = f"Matched: {', '.join(matched[:3])}" if matched else None
-            message = self.format_job_message(job, explanation)
-            keyboard = self.create_job_keyboard(job_id)
-            try:
-                await update.message.reply_text(message, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
-            except Exception as e:
-                logger.warning(f"Failed to send digest message to user {user_id}: {e}")
+            # Format (do not include raw numeric score; show matched keywords only)
+            items.append((job, f"Matched: {', '.join(matched[:3])}" if matched else None))
+        
+        try:
+            cards = await asyncio.to_thread(self.build_job_cards, items)
+        finally:
+            # Like/Dislike look the job up, so it must be stored before its card goes out
+            await record
+        await self.send_job_cards(update.message, cards)
     
     async def search_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /search command - start search conversation."""
@@ -368,7 +559,9 @@ class JobBot:
         await update.message.reply_text(f"🔍 Searching for: *{query}*...", parse_mode=ParseMode.MARKDOWN)
         
         # Search jobs
-        jobs = self.findsgjobs.search_custom(query, limit=25, user_id=user_id, context=context)
+        jobs = await self.findsgjobs.run_blocking(
+            self.findsgjobs.search_custom, query, limit=25, user_id=user_id, context=context
+        )
         
         if not jobs:
             await update.message.reply_text(
@@ -381,17 +574,13 @@ class JobBot:
         keyword_added = False
         normalized_query = query.lower()
         if len(normalized_query) >= 2 and len(normalized_query) <= 60:
-            # Check if manual keyword list is full
-            manual_count = self.db.count_manual_keywords(user_id, positive_only=True)
+            # Check if manual keyword list is full and whether the keyword already exists (any source)
+            existing, manual_count = await self._db(self.db.get_keyword_and_manual_count, user_id, normalized_query)
             if manual_count < config.MAX_MANUAL_KEYWORDS:
-                # Check if keyword already exists (any source)
-                existing = next(
-                    (kw for kw in self.db.get_user_keywords(user_id) if kw['keyword'] == normalized_query),
-                    None
-                )
                 if not existing:
                     # Add as manual keyword with moderate weight
-                    self.db.upsert_keyword(
+                    await self._db(
+                        self.db.upsert_keyword,
                         user_id=user_id,
                         keyword=normalized_query,
                         weight=1.0,
@@ -399,33 +588,22 @@ class JobBot:
                         rationale='Auto-added from search query',
                         source='manual'
                     )
+                    self._invalidate_ranking(user_id)
                     keyword_added = True
-                    logger.info(f"[SEARCH] Auto-added search term '{normalized_query}' as manual keyword for user {user_id}")
+                    logger.info("[SEARCH] Auto-added search term '%s' as manual keyword for user %s", normalized_query, user_id)
         
         # Send top 5 results
         count = min(len(jobs), 5)
         
-        for job in jobs[:count]:
-            # Cache job
-            try:
-                self.db.upsert_job(job)
-            except Exception as e:
-                logger.warning(f"Failed to upsert job {job.get('id')}: {e}")
-                # Continue and still attempt to send the job
-            job_id = job.get('id')
-            
-            # Log interaction
-            self.db.log_interaction(user_id, job_id, 'shown')
-            
-            # Send job
-            message = self.format_job_message(job)
-            keyboard = self.create_job_keyboard(job_id)
-            
-            await update.message.reply_text(
-                message,
-                reply_markup=keyboard,
-                parse_mode=ParseMode.MARKDOWN
-            )
+        top = jobs[:count]
+        # Cache jobs and log them as shown in a worker thread while the cards are built
+        record = asyncio.create_task(asyncio.to_thread(self.record_shown_jobs, user_id, top, 'SEARCH'))
+        try:
+            cards = await asyncio.to_thread(self.build_job_cards, [(job, None) for job in top])
+        finally:
+            # Like/Dislike look the job up, so it must be stored before its card goes out
+            await record
+        await self.send_job_cards(update.message, cards)
         
         # Notify user if keyword was auto-added
         if keyword_added:
@@ -439,14 +617,14 @@ class JobBot:
     async def default_text_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle default text input as a direct search query (non-command)."""
         # Reuse search processing flow but don't prompt; treat the text as a query
-        logger.info(f"[DEFAULT] User {update.effective_user.id} sent text; treating as search query")
+        logger.info("[DEFAULT] User %s sent text; treating as search query", update.effective_user.id)
         return await self.process_search_query(update, context)
     
     async def view_keywords_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /view_keywords command - show user profile."""
         user_id = update.effective_user.id
         
-        display = self.keyword_manager.get_top_keywords_display(user_id)
+        display = await self._db(self.keyword_manager.get_top_keywords_display, user_id)
         kb = InlineKeyboardMarkup([[InlineKeyboardButton("🧾 Manage Keywords", callback_data="km:menu")]])
         await update.message.reply_text(display, parse_mode=ParseMode.MARKDOWN, reply_markup=kb)
 
@@ -468,12 +646,11 @@ class JobBot:
             return WAITING_FOR_MANUAL_KEYWORD
 
         # Check duplicate and manual slot limit
-        existing = next((kw for kw in self.db.get_user_keywords(user_id) if kw['keyword'] == keyword), None)
+        existing, manual_count = await self._db(self.db.get_keyword_and_manual_count, user_id, keyword)
         if existing and existing.get('source') == 'manual':
             await update.message.reply_text(f"✅ Keyword '{keyword}' is already in your manual keywords.")
             return ConversationHandler.END
 
-        manual_count = self.db.count_manual_keywords(user_id, positive_only=True)
         if manual_count >= config.MAX_MANUAL_KEYWORDS:
             await update.message.reply_text(
                 f"❌ You've reached the maximum of {config.MAX_MANUAL_KEYWORDS} manual keywords. Remove one before adding more."
@@ -481,22 +658,15 @@ class JobBot:
             return ConversationHandler.END
 
         # Add keyword as manual positive (fixed weight)
-        self.db.upsert_keyword(user_id=user_id, keyword=keyword, weight=1.0, is_negative=False, rationale='Manually added', source='manual')
+        await self._db(self.db.upsert_keyword, user_id=user_id, keyword=keyword, weight=1.0, is_negative=False, rationale='Manually added', source='manual')
+        self._invalidate_ranking(user_id)
 
         await update.message.reply_text(f"✅ Added manual keyword: *{keyword}*", parse_mode=ParseMode.MARKDOWN)
         return ConversationHandler.END
 
     async def keyword_management_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show keyword management menu with inline buttons."""
-        user_id = update.effective_user.id
-        kb = [
-            [InlineKeyboardButton("🗑️ Remove One Keyword", callback_data="km:remove_one")],
-            [InlineKeyboardButton("🤖 Clear All Auto Keywords", callback_data="km:clear_auto")],
-            [InlineKeyboardButton("✍️ Clear All Manual Keywords", callback_data="km:clear_manual")],
-            [InlineKeyboardButton("🧹 Clear All Keywords", callback_data="km:clear_all")],
-            [InlineKeyboardButton("🔙 Back", callback_data="km:cancel")]
-        ]
-        await update.message.reply_text("🧾 *Keyword Management Menu*", reply_markup=InlineKeyboardMarkup(kb), parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text("🧾 *Keyword Management Menu*", reply_markup=_KM_COMMAND_MARKUP, parse_mode=ParseMode.MARKDOWN)
     
     async def set_time_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /set_time command - start time setting conversation."""
@@ -521,20 +691,19 @@ class JobBot:
         args = context.args
         if args:
             # Backward compatibility: parse immediate argument
-            try:
-                amount = int(args[0])
-                if amount < 0:
-                    raise ValueError()
-            except Exception:
+            if not _SALARY_INPUT_RE.fullmatch(args[0]):
                 await update.message.reply_text("❌ Invalid amount. Please provide a positive integer (SGD) or 0 to clear.")
                 return
+            amount = int(args[0])
 
             if amount == 0:
-                self.db.update_user_min_salary(user_id, None)
+                await self._db(self.db.update_user_min_salary, user_id, None)
+                self._invalidate_ranking(user_id)
                 await update.message.reply_text("✅ Monthly minimum salary filter cleared.")
                 return
 
-            self.db.update_user_min_salary(user_id, amount)
+            await self._db(self.db.update_user_min_salary, user_id, amount)
+            self._invalidate_ranking(user_id)
             await update.message.reply_text(f"✅ Minimum monthly salary filter set to ${amount} SGD.")
             return
 
@@ -553,11 +722,8 @@ class JobBot:
         time_str = update.message.text.strip()
         
         # Validate format
-        try:
-            hour, minute = map(int, time_str.split(':'))
-            if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                raise ValueError()
-        except:
+        match = _TIME_INPUT_RE.fullmatch(time_str)
+        if not match:
             await update.message.reply_text(
                 "❌ Invalid time format. Please use HH:MM (00-23 for hours, 00-59 for minutes).\n\n"
                 "Examples: `09:00`, `09:17`, `18:45`\n\n"
@@ -565,9 +731,11 @@ class JobBot:
                 parse_mode=ParseMode.MARKDOWN
             )
             return WAITING_FOR_TIME
+        # Store zero-padded so e.g. "9:5" is saved as "09:05"
+        time_str = f"{int(match.group(1)):02d}:{int(match.group(2)):02d}"
         
         # Update user
-        self.db.set_notification_time(user_id, time_str)
+        await self._db(self.db.set_notification_time, user_id, time_str)
         
         await update.message.reply_text(
             f"✅ Daily digest time set to *{time_str}* (Singapore Time)",
@@ -579,20 +747,19 @@ class JobBot:
         """Process user's min salary conversation input."""
         user_id = update.effective_user.id
         text = update.message.text.strip()
-        try:
-            amount = int(text)
-            if amount < 0:
-                raise ValueError()
-        except Exception:
+        if not _SALARY_INPUT_RE.fullmatch(text):
             await update.message.reply_text("❌ Invalid amount. Please send a positive integer (SGD) or 0 to clear.")
             return WAITING_FOR_MIN_SALARY
+        amount = int(text)
 
         if amount == 0:
-            self.db.update_user_min_salary(user_id, None)
+            await self._db(self.db.update_user_min_salary, user_id, None)
+            self._invalidate_ranking(user_id)
             await update.message.reply_text("✅ Monthly minimum salary filter cleared.")
             return ConversationHandler.END
 
-        self.db.update_user_min_salary(user_id, amount)
+        await self._db(self.db.update_user_min_salary, user_id, amount)
+        self._invalidate_ranking(user_id)
         await update.message.reply_text(f"✅ Minimum monthly salary filter set to ${amount} SGD.")
         return ConversationHandler.END
     
@@ -608,9 +775,9 @@ class JobBot:
         """Handle /toggle_notifications command."""
         user_id = update.effective_user.id
         
-        new_state = self.db.toggle_notifications(user_id)
+        new_state = await self._db(self.db.toggle_notifications, user_id)
         # Retrieve current stored time and timezone for the user
-        user = self.db.get_user(user_id)
+        user = await self._db(self.db.get_user, user_id)
         time_str = None
         tz = config.DEFAULT_TIMEZONE
         if user:
@@ -621,7 +788,7 @@ class JobBot:
             # Ensure next_digest_at is recalculated when enabling notifications
             if time_str:
                 try:
-                    self.db.set_notification_time(user_id, time_str)
+                    await self._db(self.db.set_notification_time, user_id, time_str)
                 except Exception:
                     # Best-effort; we don't want toggling to fail due to scheduling issues
                     logger.exception("Could not update next_digest_at for user %s", user_id)
@@ -635,152 +802,166 @@ class JobBot:
 
     async def reset_profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start flow to reset user profile (keywords/interactions)."""
-        user_id = update.effective_user.id
-        kb = [
-            [InlineKeyboardButton("✅ Reset Everything", callback_data="reset:confirm:all"), InlineKeyboardButton("❌ Cancel", callback_data="reset:cancel")],
-            [InlineKeyboardButton("🔧 Reset Keywords Only", callback_data="reset:confirm:keywords"), InlineKeyboardButton("📊 Reset History Only", callback_data="reset:confirm:history")]
-        ]
         await update.message.reply_text(
             "⚠️ *Reset Profile*\n\nChoose what you'd like to reset:\n• Everything: keywords + history\n• Keywords only: remove manual + auto keywords\n• History only: clear interactions (shown/liked)",
-            reply_markup=InlineKeyboardMarkup(kb),
+            reply_markup=_RESET_PROFILE_MARKUP,
             parse_mode=ParseMode.MARKDOWN
         )
     
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle inline button callbacks."""
         query = update.callback_query
+        # Answer in the background: the result isn't needed, so don't wait a round-trip before dispatching
+        task = asyncio.create_task(self._answer_query(query))
+        self._pending_answers.add(task)
+        task.add_done_callback(self._pending_answers.discard)
+        
+        # callback_data is "<prefix>:<rest>", e.g. "km:del:12", "reset:confirm:all", "like:<job_id>";
+        # each handler partitions its own rest. Unknown or malformed data is dropped right here.
+        prefix, _, rest = (query.data or '').partition(':')
+        handler = self._callback_handlers.get(prefix)
+        if handler is None or not rest:
+            return
+        await handler(query, update.effective_user.id, prefix, rest)
+
+    @staticmethod
+    async def _answer_query(query):
+        """Answer a callback query, tolerating failures (e.g. the query timed out)."""
         try:
             await query.answer()
         except Exception as e:
-            logger.warning(f"Failed to answer callback query (possible timeout): {e}")
+            logger.warning("Failed to answer callback query (possible timeout): %s", e)
             # Continue; user may still see UI update eventually
-        
-        user_id = update.effective_user.id
-        data = query.data
-        if not data:
+
+    async def _reset_callback(self, query, user_id: int, prefix: str, rest: str):
+        """Handle "reset:<action>[:<type>]" callbacks from /reset_profile."""
+        action, _, reset_type = rest.partition(':')
+        # Lazy %-formatting: the message is only built if INFO is enabled
+        logger.info("[RESET] handling action %s %s for user %s", action, reset_type, user_id)
+        if action == 'cancel':
+            await query.edit_message_text("❌ Reset cancelled.")
+            return
+        if action != 'confirm':
             return
+        if reset_type == 'all':
+            # clear keywords and history, keep notification settings
+            await self._db(self.db.reset_user_profile, user_id, keep_settings=True)
+            self._invalidate_ranking(user_id)
+            await query.edit_message_text("✅ Profile reset complete! All keywords and history cleared.")
+        elif reset_type == 'keywords':
+            await self._db(self.db.clear_all_keywords, user_id)
+            self._invalidate_ranking(user_id)
+            await query.edit_message_text("✅ All keywords cleared!")
+        elif reset_type == 'history':
+            await self._db(self.db.clear_user_interactions, user_id)
+            self._invalidate_ranking(user_id)
+            await query.edit_message_text("✅ Interaction history cleared!")
+        else:
+            await query.edit_message_text("❌ Unknown reset type.")
 
-        # Handle keyword management callbacks starting with 'km:'
-        # Reset profile callbacks
-        if data.startswith('reset:'):
-            parts = data.split(':')
-            action = parts[1] if len(parts) > 1 else None
-            reset_type = parts[2] if len(parts) > 2 else None
-            logger.info(f"[RESET] handling action {action} {reset_type} for user {user_id}")
-            if action == 'cancel':
-                await query.edit_message_text("❌ Reset cancelled.")
-                return
-            if action == 'confirm':
-                if reset_type == 'all':
-                    # clear keywords and history, keep notification settings
-                    self.db.reset_user_profile(user_id, keep_settings=True)
-                    await query.edit_message_text("✅ Profile reset complete! All keywords and history cleared.")
-                    return
-                if reset_type == 'keywords':
-                    self.db.clear_auto_keywords(user_id)
-                    self.db.clear_manual_keywords(user_id)
-                    await query.edit_message_text("✅ All keywords cleared!")
-                    return
-                if reset_type == 'history':
-                    self.db.clear_user_interactions(user_id)
-                    await query.edit_message_text("✅ Interaction history cleared!")
-                    return
-                await query.edit_message_text("❌ Unknown reset type.")
-                return
-        if data.startswith('km:'):
-            parts = data.split(':')
-            cmd = parts[1] if len(parts) > 1 else None
-            logger.info(f"[KM] handling cmd {cmd} for user {user_id}")
-            if cmd == 'menu' or cmd == 'cancel':
-                kb = [
-                    [InlineKeyboardButton("🗑️ Remove One Keyword", callback_data="km:remove_one")],
-                    [InlineKeyboardButton("🤖 Clear All Auto Keywords", callback_data="km:clear_auto")],
-                    [InlineKeyboardButton("✍️ Clear All Manual Keywords", callback_data="km:clear_manual")],
-                    [InlineKeyboardButton("🧹 Clear All Keywords", callback_data="km:clear_all")],
-                    [InlineKeyboardButton("❌ Cancel", callback_data="km:cancel")]
-                ]
-                await query.edit_message_text("🧾 Keyword Management Menu", reply_markup=InlineKeyboardMarkup(kb))
-                return
-            if cmd == 'remove_one':
-                kws = self.db.get_user_keywords(user_id)
-                if not kws:
-                    await query.edit_message_text("You have no keywords.")
-                    return
-                kb = []
-                for kw in kws:
-                    source = kw.get('source') or 'auto'
-                    emoji = '✍️' if source == 'manual' else '🤖'
-                    kb.append([InlineKeyboardButton(f"{emoji} {kw['keyword']}", callback_data=f"km:del:{kw['id']}")])
-                kb.append([InlineKeyboardButton("🔙 Back to menu", callback_data="km:menu")])
-                await query.edit_message_text("Select a keyword to remove:", reply_markup=InlineKeyboardMarkup(kb))
-                return
-            if cmd == 'del' and len(parts) > 2:
-                kid = parts[2]
-                kw = self.db.get_keyword_by_id(user_id, int(kid))
-                if not kw:
-                    await query.edit_message_text("Keyword not found.")
-                    return
-                kb = [
-                    [InlineKeyboardButton("✅ Yes, delete", callback_data=f"km:del_confirm:{kid}"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]
-                ]
-                await query.edit_message_text(f"⚠️ Delete keyword: *{kw['keyword']}*?", reply_markup=InlineKeyboardMarkup(kb), parse_mode=ParseMode.MARKDOWN)
-                return
-            if cmd == 'del_confirm' and len(parts) > 2:
-                kid = parts[2]
-                kw = self.db.get_keyword_by_id(user_id, int(kid))
-                if not kw:
-                    await query.edit_message_text("Keyword not found.")
-                    return
-                self.db.delete_keyword_by_id(user_id, int(kid))
-                await query.edit_message_text(f"✅ Deleted keyword: {kw['keyword']}")
-                return
-            if cmd == 'clear_auto':
-                kb = [[InlineKeyboardButton("✅ Yes, clear auto keywords", callback_data="km:clear_auto_confirm"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]]
-                await query.edit_message_text("⚠️ Delete ALL auto-generated keywords?", reply_markup=InlineKeyboardMarkup(kb))
-                return
-            if cmd == 'clear_auto_confirm':
-                self.db.clear_auto_keywords(user_id)
-                await query.edit_message_text("✅ Cleared auto-generated keywords.")
-                return
-            if cmd == 'clear_manual':
-                kb = [[InlineKeyboardButton("✅ Yes, clear manual keywords", callback_data="km:clear_manual_confirm"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]]
-                await query.edit_message_text("⚠️ Delete ALL manual keywords?", reply_markup=InlineKeyboardMarkup(kb))
-                return
-            if cmd == 'clear_manual_confirm':
-                self.db.clear_manual_keywords(user_id)
-                await query.edit_message_text("✅ Cleared manual keywords.")
-                return
-            if cmd == 'clear_all':
-                kb = [[InlineKeyboardButton("✅ Yes, clear all keywords", callback_data="km:clear_all_confirm"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]]
-                await query.edit_message_text("⚠️ Delete ALL keywords (manual + auto)?", reply_markup=InlineKeyboardMarkup(kb))
-                return
-            if cmd == 'clear_all_confirm':
-                self.db.clear_auto_keywords(user_id)
-                self.db.clear_manual_keywords(user_id)
-                await query.edit_message_text("✅ Cleared all keywords.")
-                return
+    async def _km_callback(self, query, user_id: int, prefix: str, rest: str):
+        """Handle "km:<cmd>[:<arg>]" keyword management callbacks."""
+        cmd, _, arg = rest.partition(':')
+        logger.info("[KM] handling cmd %s for user %s", cmd, user_id)
+        handler = self._km_handlers.get(cmd)
+        if handler is None:
             await query.edit_message_text("Unknown keyword management command.")
             return
+        await handler(query, user_id, arg)
+
+    async def _km_menu(self, query, user_id: int, arg: str):
+        await query.edit_message_text("🧾 Keyword Management Menu", reply_markup=_KM_MENU_MARKUP)
 
-        # Parse like/dislike callback data
-        if ':' not in data:
+    async def _km_remove_one(self, query, user_id: int, arg: str):
+        kws = await self._db(self.db.get_keyword_choices, user_id)
+        if not kws:
+            await query.edit_message_text("You have no keywords.")
             return
-        action, job_id = data.split(':', 1)
-        if action not in ['like', 'dislike']:
+        kb = [
+            [InlineKeyboardButton(f"{'✍️' if source == 'manual' else '🤖'} {kw_text}", callback_data=f"km:del:{kid}")]
+            for kid, kw_text, source in kws
+        ]
+        kb.append(_KM_BACK_TO_MENU_ROW)
+        await query.edit_message_text("Select a keyword to remove:", reply_markup=InlineKeyboardMarkup(kb))
+
+    async def _km_delete(self, query, user_id: int, arg: str):
+        if not arg:
+            await query.edit_message_text("Unknown keyword management command.")
+            return
+        kw = await self._db(self.db.get_keyword_by_id, user_id, int(arg))
+        if not kw:
+            await query.edit_message_text("Keyword not found.")
             return
+        kb = [
+            [InlineKeyboardButton("✅ Yes, delete", callback_data=f"km:del_confirm:{arg}"), InlineKeyboardButton("🔙 Back", callback_data="km:menu")]
+        ]
+        await query.edit_message_text(f"⚠️ Delete keyword: *{kw['keyword']}*?", reply_markup=InlineKeyboardMarkup(kb), parse_mode=ParseMode.MARKDOWN)
+
+    async def _km_delete_confirm(self, query, user_id: int, arg: str):
+        if not arg:
+            await query.edit_message_text("Unknown keyword management command.")
+            return
+        kw = await self._db(self.db.get_keyword_by_id, user_id, int(arg))
+        if not kw:
+            await query.edit_message_text("Keyword not found.")
+            return
+        await self._db(self.db.delete_keyword_by_id, user_id, int(arg))
+        self._invalidate_ranking(user_id)
+        await query.edit_message_text(f"✅ Deleted keyword: {kw['keyword']}")
+
+    async def _km_clear_auto(self, query, user_id: int, arg: str):
+        await query.edit_message_text("⚠️ Delete ALL auto-generated keywords?", reply_markup=_KM_CLEAR_AUTO_MARKUP)
+
+    async def _km_clear_auto_confirm(self, query, user_id: int, arg: str):
+        await self._db(self.db.clear_auto_keywords, user_id)
+        self._invalidate_ranking(user_id)
+        await query.edit_message_text("✅ Cleared auto-generated keywords.")
+
+    async def _km_clear_manual(self, query, user_id: int, arg: str):
+        await query.edit_message_text("⚠️ Delete ALL manual keywords?", reply_markup=_KM_CLEAR_MANUAL_MARKUP)
+
+    async def _km_clear_manual_confirm(self, query, user_id: int, arg: str):
+        await self._db(self.db.clear_manual_keywords, user_id)
+        self._invalidate_ranking(user_id)
+        await query.edit_message_text("✅ Cleared manual keywords.")
+
+    async def _km_clear_all(self, query, user_id: int, arg: str):
+        await query.edit_message_text("⚠️ Delete ALL keywords (manual + auto)?", reply_markup=_KM_CLEAR_ALL_MARKUP)
+
+    async def _km_clear_all_confirm(self, query, user_id: int, arg: str):
+        await self._db(self.db.clear_all_keywords, user_id)
+        self._invalidate_ranking(user_id)
+        await query.edit_message_text("✅ Cleared all keywords.")
+
+    def _record_feedback(self, user_id: int, job_id: str, action: str) -> Optional[dict]:
+        """Look up the job, then log the interaction and update keywords in one commit.
+
+        Blocking (DB + LLM); called in a worker thread. Returns None if the job isn't cached.
+        """
+        job = self.db.get_job(job_id)
+        if job:
+            self.keyword_manager.update_keywords_from_feedback(user_id, job, action, interaction_job_id=job_id)
+        return job
+
+    async def _feedback_callback(self, query, user_id: int, action: str, job_id: str):
+        """Handle "like:<job_id>" / "dislike:<job_id>" callbacks (job ids may contain ':')."""
         
-        # Show processing message
+        # Show the processing message while the feedback is recorded (neither waits on the other)
         processing_text = "⏳ Processing your feedback..."
+        processing = asyncio.create_task(query.edit_message_text(
+            processing_text,
+            parse_mode=ParseMode.MARKDOWN
+        ))
+        # Feedback changes the user's keyword weights, so a cached /more ranking is stale
+        self._invalidate_ranking(user_id)
         try:
-            await query.edit_message_text(
-                processing_text,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        except Exception as e:
-            logger.warning(f"Could not show processing message: {e}")
-        
-        # Get job from database
-        job = self.db.get_job(job_id)
+            job = await asyncio.to_thread(self._record_feedback, user_id, job_id, action)
+        finally:
+            # The result edits below must land after the processing message
+            try:
+                await processing
+            except Exception as e:
+                logger.warning("Could not show processing message: %s", e)
         if not job:
             await query.edit_message_text(
                 "❌ Job not found in database.",
@@ -788,48 +969,33 @@ class JobBot:
             )
             return
         
-        # Log interaction
-        self.db.log_interaction(user_id, job_id, action)
-        
-        # Update keywords based on feedback
-        self.keyword_manager.update_keywords_from_feedback(user_id, job, action)
-        
         # Update message
-        emoji = "👍" if action == 'like' else "👎"
-        feedback_msg = f"\n\n{emoji} *{action.capitalize()}d!* Your profile has been updated."
-        
+        feedback_msg, short_msg = _FEEDBACK_MESSAGES[action]
+        base = query.message.text
+        if len(base) + len(feedback_msg) > MessageLimit.MAX_TEXT_LENGTH:
+            # Telegram would reject the edit; skip straight to the short reply
+            await query.message.reply_text(short_msg, parse_mode=ParseMode.MARKDOWN)
+            return
         try:
             await query.edit_message_text(
-                query.message.text + feedback_msg,
+                base + feedback_msg,
                 parse_mode=ParseMode.MARKDOWN
             )
-        except:
+        except BadRequest:
             # Message might be too old to edit
-            await query.message.reply_text(
-                f"{emoji} Job {action}d! Your profile has been updated.",
-                parse_mode=ParseMode.MARKDOWN
-            )
+            await query.message.reply_text(short_msg, parse_mode=ParseMode.MARKDOWN)
     
     def create_application(self, start_scheduler: bool = False) -> Application:
         """Create and configure the bot application."""
         
         async def set_commands(application):
-            """Set bot commands after initialization."""
-            commands = [
-                BotCommand("start", "Start the bot and get welcome message"),
-                BotCommand("more", "Get personalized job recommendations"),
-                BotCommand("search", "Search for jobs with specific keywords"),
-                BotCommand("view_keywords", "View your keyword profile"),
-                BotCommand("add_keyword", "Add a manual keyword to your profile"),
-                BotCommand("keyword_management", "Manage and remove keywords"),
-                BotCommand("set_time", "Set daily notification time"),
-                BotCommand("set_min_salary", "Set minimum monthly salary filter (SGD)"),
-                BotCommand("toggle_notifications", "Turn daily digest on/off"),
-                BotCommand("digest_now", "Receive an immediate digest (testing)"),
-                BotCommand("reset_profile", "Reset your profile (keywords/history)"),
-                BotCommand("help", "Show help and available commands"),
-            ]
-            await application.bot.set_my_commands(commands)
+            """Set bot commands after initialization, skipping the call if the menu is unchanged."""
+            digest = _bot_commands_digest(application.bot.id)
+            if await self._db(self.db.get_cache_value, _BOT_COMMANDS_CACHE_KEY) == digest:
+                logger.info("Bot commands unchanged since last start; not re-sending")
+                return
+            await application.bot.set_my_commands(BOT_COMMANDS)
+            await self._db(self.db.set_daily_cache, _BOT_COMMANDS_CACHE_KEY, digest, date.today().isoformat())
         
         async def _post_init(application):
             # set commands as before
@@ -840,14 +1006,26 @@ class JobBot:
                 from scheduler import start_background_scheduler
                 start_background_scheduler(application)
 
-        application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).post_init(_post_init).build()
+        builder = Application.builder().token(config.TELEGRAM_BOT_TOKEN).post_init(_post_init)
+        # Let slow updates (searches, ranking) from one chat overlap with other chats' updates
+        if config.BOT_CONCURRENT_UPDATES > 1:
+            builder = builder.concurrent_updates(config.BOT_CONCURRENT_UPDATES)
+        try:
+            # Queues sends within Telegram's flood limits and retries on RetryAfter
+            builder = builder.rate_limiter(AIORateLimiter(max_retries=3))
+        except RuntimeError:
+            logger.warning("AIORateLimiter unavailable (install python-telegram-bot[rate-limiter]); sending without it")
+        application = builder.build()
+        
+        # Plain text messages (not commands); one filter object shared by every text handler
+        text_only = filters.TEXT & ~filters.COMMAND
         
         # Conversation handler for /search
         search_handler = ConversationHandler(
             entry_points=[CommandHandler("search", self.search_command)],
             states={
                 WAITING_FOR_SEARCH_QUERY: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.process_search_query)
+                    MessageHandler(text_only, self.process_search_query)
                 ],
             },
             fallbacks=[CommandHandler("cancel", self.cancel_command)],
@@ -858,7 +1036,7 @@ class JobBot:
             entry_points=[CommandHandler("set_time", self.set_time_command)],
             states={
                 WAITING_FOR_TIME: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.process_time_input)
+                    MessageHandler(text_only, self.process_time_input)
                 ],
             },
             fallbacks=[CommandHandler("cancel", self.cancel_command)],
@@ -869,7 +1047,7 @@ class JobBot:
             entry_points=[CommandHandler("set_min_salary", self.set_min_salary)],
             states={
                 WAITING_FOR_MIN_SALARY: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.process_min_salary_input)
+                    MessageHandler(text_only, self.process_min_salary_input)
                 ],
             },
             fallbacks=[CommandHandler("cancel", self.cancel_command)],
@@ -883,38 +1061,47 @@ class JobBot:
         add_keyword_handler = ConversationHandler(
             entry_points=[CommandHandler("add_keyword", self.add_keyword_command)],
             states={
-                WAITING_FOR_MANUAL_KEYWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.process_manual_keyword_input)]
+                WAITING_FOR_MANUAL_KEYWORD: [MessageHandler(text_only, self.process_manual_keyword_input)]
             },
             fallbacks=[CommandHandler("cancel", self.cancel_command)],
         )
         application.add_handler(add_keyword_handler)
         
         # Other command handlers
-        application.add_handler(CommandHandler("start", self.start_command))
-        application.add_handler(CommandHandler("more", self.more_command))
-        application.add_handler(CommandHandler("view_keywords", self.view_keywords_command))
-        # `set_min_salary` is handled by a ConversationHandler (set_min_salary_handler) above
-        application.add_handler(CommandHandler("digest_now", self.digest_now))
-        application.add_handler(CommandHandler("reset_profile", self.reset_profile_command))
-        # `add_keyword` is registered as a ConversationHandler; don't add a plain command handler here to avoid duplicate handling.
-        application.add_handler(CommandHandler("keyword_management", self.keyword_management_command))
-        application.add_handler(CommandHandler("toggle_notifications", self.toggle_notifications_command))
-        application.add_handler(CommandHandler("help", self.help_command))
+        # `search`, `set_time`, `set_min_salary` and `add_keyword` are ConversationHandler entry points above;
+        # don't add plain command handlers for them to avoid duplicate handling.
+        # (command, callback, block): block=False runs the callback as a task so slow searches
+        # don't hold up the update that follows them
+        commands = (
+            ("start", self.start_command, True),
+            ("more", self.more_command, False),
+            ("view_keywords", self.view_keywords_command, True),
+            ("digest_now", self.digest_now, False),
+            ("reset_profile", self.reset_profile_command, True),
+            ("keyword_management", self.keyword_management_command, True),
+            ("toggle_notifications", self.toggle_notifications_command, True),
+            ("help", self.help_command, True),
+        )
+        for name, callback, block in commands:
+            application.add_handler(CommandHandler(name, callback, block=block))
         # Default text handler should be registered after conversation handlers so it doesn't interfere
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.default_text_handler))
+        application.add_handler(MessageHandler(text_only, self.default_text_handler))
         
-        # Callback handler for inline buttons
-        application.add_handler(CallbackQueryHandler(self.button_callback))
+        # Callback handler for inline buttons (non-blocking: feedback presses wait on the DB and the LLM)
+        application.add_handler(CallbackQueryHandler(self.button_callback, block=False))
         
         return application
 
 
 # Global bot instance
 _bot = None
+_bot_lock = threading.Lock()
 
 def get_bot() -> JobBot:
-    """Get global bot instance."""
+    """Get global bot instance (created once, thread-safe)."""
     global _bot
     if _bot is None:
-        _bot = JobBot()
+        with _bot_lock:
+            if _bot is None:
+                _bot = JobBot()
     return _bot
@@ -35,10 +35,22 @@ class DatabaseClearer:
         if not os.path.exists(self.db_path):
             print(f"❌ Database file not found: {self.db_path}")
             sys.exit(1)
+        self.conn = None
 
     def connect(self):
-        """Connect to database."""
-        return sqlite3.connect(self.db_path)
+        """Connect to database (one connection is opened and reused for the whole run)."""
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, timeout=30)
+            # Match the bot's settings; the timeout waits out a running bot's write instead of failing
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        return self.conn
+
+    def close(self):
+        """Close the shared connection."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
     def get_table_counts(self, conn):
         """Get row counts for all tables."""
@@ -57,48 +69,42 @@ class DatabaseClearer:
 
     def clear_all_data(self, conn):
         """Clear all data from all tables."""
-        cursor = conn.cursor()
-
         print("🗑️  Clearing all data...")
 
-        # Disable foreign key constraints temporarily
-        cursor.execute("PRAGMA foreign_keys = OFF")
-
-        # Clear tables in correct order (respecting foreign keys)
-        tables = ['interactions', 'user_keywords', 'users', 'jobs']
-        for table in tables:
-            cursor.execute(f"DELETE FROM {table}")
+        # One script, one transaction (one commit). Foreign keys can only be toggled
+        # outside a transaction, so the PRAGMAs wrap BEGIN/COMMIT.
+        # Tables are cleared in order (respecting foreign keys), then auto-increment counters are reset
+        # in place (UPDATE, not DELETE, so the sqlite_sequence rows are reused).
+        conn.executescript("""
+            PRAGMA foreign_keys = OFF;
+            BEGIN;
+            DELETE FROM interactions;
+            DELETE FROM user_keywords;
+            DELETE FROM users;
+            DELETE FROM jobs;
+            UPDATE sqlite_sequence SET seq = 0 WHERE name IN ('interactions', 'user_keywords', 'users', 'jobs');
+            COMMIT;
+            PRAGMA foreign_keys = ON;
+        """)
+        for table in ['interactions', 'user_keywords', 'users', 'jobs']:
             print(f"   Cleared {table} table")
-
-        # Reset auto-increment counters
-        cursor.execute("DELETE FROM sqlite_sequence")
-
-        # Re-enable foreign key constraints
-        cursor.execute("PRAGMA foreign_keys = ON")
-
-        conn.commit()
         print("✅ All data cleared successfully")
 
     def clear_user_data(self, conn):
         """Clear user-related data (users, keywords, interactions)."""
-        cursor = conn.cursor()
-
         print("👥 Clearing user data...")
 
-        # Clear in order to respect foreign keys
-        cursor.execute("DELETE FROM interactions")
-        print("   Cleared interactions table")
-
-        cursor.execute("DELETE FROM user_keywords")
-        print("   Cleared user_keywords table")
-
-        cursor.execute("DELETE FROM users")
-        print("   Cleared users table")
-
-        # Reset auto-increment counters
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('users', 'user_keywords', 'interactions')")
-
-        conn.commit()
+        # Clear in order to respect foreign keys and reset auto-increment counters, in one transaction
+        conn.executescript("""
+            BEGIN;
+            DELETE FROM interactions;
+            DELETE FROM user_keywords;
+            DELETE FROM users;
+            UPDATE sqlite_sequence SET seq = 0 WHERE name IN ('users', 'user_keywords', 'interactions');
+            COMMIT;
+        """)
+        for table in ['interactions', 'user_keywords', 'users']:
+            print(f"   Cleared {table} table")
         print("✅ User data cleared successfully")
 
     def clear_job_cache(self, conn):
@@ -115,24 +121,21 @@ class DatabaseClearer:
 
     def clear_interactions(self, conn):
         """Clear interaction history only."""
-        cursor = conn.cursor()
-
         print("📊 Clearing interaction history...")
 
-        cursor.execute("DELETE FROM interactions")
+        # Clear the table and reset its auto-increment counter in one transaction
+        conn.executescript("""
+            BEGIN;
+            DELETE FROM interactions;
+            UPDATE sqlite_sequence SET seq = 0 WHERE name = 'interactions';
+            COMMIT;
+        """)
         print("   Cleared interactions table")
-
-        # Reset auto-increment counter
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'interactions'")
-
-        conn.commit()
         print("✅ Interaction history cleared successfully")
 
     def show_status(self):
         """Show current database status."""
-        conn = self.connect()
-        counts = self.get_table_counts(conn)
-        conn.close()
+        counts = self.get_table_counts(self.connect())
 
         print("📊 Current Database Status:")
         print(f"   Users: {counts['users']}")
@@ -211,7 +214,7 @@ def main():
         print(f"❌ Error: {e}")
         conn.rollback()
     finally:
-        conn.close()
+        clearer.close()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@
 import os
 from typing import Optional
 from dotenv import load_dotenv
+from pytz import timezone
 
 load_dotenv()
 
@@ -11,6 +12,9 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 # FindSGJobs API
 FINDSGJOBS_API_ENDPOINT = os.getenv("FINDSGJOBS_API_ENDPOINT", "https://www.findsgjobs.com/apis/job/search")
 FINDSGJOBS_USE_SEARCHABLE = os.getenv("FINDSGJOBS_USE_SEARCHABLE", "false").lower() == "true"
+# In-memory response cache: identical searches within the TTL reuse the previous result
+FINDSGJOBS_CACHE_TTL_SECONDS = int(os.getenv("FINDSGJOBS_CACHE_TTL_SECONDS", "300"))
+FINDSGJOBS_CACHE_MAX_ENTRIES = int(os.getenv("FINDSGJOBS_CACHE_MAX_ENTRIES", "128"))
 
 # OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -18,6 +22,8 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # Database
 # Default to new database filename for FindSGJobs migration
 DATABASE_PATH = os.getenv("DATABASE_PATH", "job_bot_findsgjobs.db")
+# Read-only connections shared by concurrent readers (writes use one separate connection; 0 = off)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
 
 # Currency constants for FindSGJobs
 CURRENCIES = {
@@ -50,6 +56,12 @@ MAX_NEW_POSITIVE_PER_FEEDBACK = int(os.getenv("MAX_NEW_POSITIVE_PER_FEEDBACK", 3
 MAX_NEW_NEGATIVE_PER_FEEDBACK = int(os.getenv("MAX_NEW_NEGATIVE_PER_FEEDBACK", 2))
 # Number of days to exclude recently shown jobs from recommendations
 EXCLUDE_RECENT_DAYS = int(os.getenv("EXCLUDE_RECENT_DAYS", 3))
+# Seconds a user's keyword list is cached in memory (invalidated on every keyword change; 0 = off)
+KEYWORD_CACHE_TTL_SECONDS = int(os.getenv("KEYWORD_CACHE_TTL_SECONDS", 60))
+# Seconds the unsent rest of a /more ranking is reused by the next /more (dropped on feedback; 0 = off)
+RANKING_CACHE_TTL_SECONDS = int(os.getenv("RANKING_CACHE_TTL_SECONDS", 120))
+# Number of job rows kept in memory for feedback lookups (refreshed on upsert; 0 = off)
+JOB_CACHE_MAX_ENTRIES = int(os.getenv("JOB_CACHE_MAX_ENTRIES", 2048))
 # Manual keyword settings
 # Max number of manual (positive) keywords a user can add
 MAX_MANUAL_KEYWORDS = int(os.getenv("MAX_MANUAL_KEYWORDS", 3))
@@ -62,6 +74,8 @@ WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL")
 
 # Timezone
 DEFAULT_TIMEZONE = "Asia/Singapore"
+# Built once and shared: pytz zone lookups would otherwise repeat on every digest calculation
+TZ = timezone(DEFAULT_TIMEZONE)
 
 
 def _str2bool(val, default=False):
@@ -90,6 +104,10 @@ SCHEDULER_TZ = os.getenv("SCHEDULER_TZ", DEFAULT_TIMEZONE)
 SCHEDULER_MAX_INSTANCES = int(os.getenv("SCHEDULER_MAX_INSTANCES", "1"))
 SCHEDULER_COALESCE = _str2bool(os.getenv("SCHEDULER_COALESCE", "1"), True)
 SCHEDULER_MISFIRE_GRACE_TIME = int(os.getenv("SCHEDULER_MISFIRE_GRACE_TIME", "300"))
+# Number of users whose digests are sent concurrently (messages within one chat stay in order)
+DIGEST_CONCURRENCY = int(os.getenv("DIGEST_CONCURRENCY", "5"))
+# Number of Telegram updates processed at the same time (1 = strictly one after another)
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "8"))
 
 # Optional distributed locking with Redis (future use)
 SCHEDULER_USE_DISTRIBUTED_LOCK = _str2bool(os.getenv("SCHEDULER_USE_DISTRIBUTED_LOCK", "0"), False)
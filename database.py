@@ -1,13 +1,56 @@
 """Database models and operations for the Telegram Job Bot."""
 import sqlite3
+import threading
 import logging
 import json
+import os
+import time
+import queue
+from contextlib import contextmanager
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
-from pytz import timezone
+import urllib.parse
 import config
 
 
+class ConnectionPool:
+    """Fixed set of read-only connections handed out one caller at a time.
+
+    Under WAL each reader sees the last committed state and never blocks the writer, so
+    concurrent handlers and the scheduler can read in parallel instead of queueing on one handle.
+    """
+
+    def __init__(self, db_path: str, size: int):
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all = []
+        uri = f"file:{urllib.parse.quote(os.path.abspath(db_path))}?mode=ro"
+        for _ in range(size):
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-16000")
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._all.append(conn)
+            self._connections.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """Check out a connection and yield a cursor on it; blocks while all are in use."""
+        conn = self._connections.get()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            # Closing the cursor ends its read snapshot before the next caller gets the connection
+            cursor.close()
+            self._connections.put(conn)
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+
+
 class Database:
     """SQLite database manager for job bot."""
     
@@ -15,13 +58,91 @@ class Database:
         """Initialize database connection."""
         self.db_path = db_path or config.DATABASE_PATH
         self.conn = None
+        self._pool: Optional[ConnectionPool] = None
+        # Serializes writers on self.conn so one thread's commit can't flush another's half-done writes
+        self._write_lock = threading.RLock()
+        # Per-user keyword cache: user_id -> (expires_at, rows sorted by weight desc,
+        # keyword -> row, positive manual keyword count); see _keyword_cache_entry()
+        self._keyword_cache: Dict[int, Tuple[float, List[Dict], Dict[str, Dict], int]] = {}
+        self._keyword_cache_lock = threading.Lock()
+        # Bumped on every keyword write so a read that raced a write doesn't cache stale rows
+        self._keyword_cache_generation = 0
+        # LRU of job rows by job_id (feedback buttons look the same digest jobs up repeatedly)
+        self._job_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._job_cache_lock = threading.Lock()
+        self._job_cache_generation = 0
+        # Per-thread nesting depth of transaction() blocks, plus the keyword users / job ids written
+        # inside the outermost block (their caches are dropped again once it commits)
+        self._tx = threading.local()
         self.connect()
         self.create_tables()
+        if config.DB_POOL_SIZE > 0 and self.db_path != ':memory:':
+            self._pool = ConnectionPool(self.db_path, config.DB_POOL_SIZE)
     
     def connect(self):
         """Connect to SQLite database."""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        # WAL lets readers proceed while a write is in progress; NORMAL sync is safe under WAL
+        # and avoids an fsync per commit. Also keep temp tables in memory, a ~64 MB page cache and
+        # memory-map up to 256 MB of the file so reads skip the read() syscall copy.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-64000")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+    
+    @contextmanager
+    def transaction(self):
+        """Group several write methods into a single commit (nestable; rolls back on error).
+
+        Methods called inside the block skip their own commit; the outermost block commits once.
+        Other threads' writes wait until the block ends.
+        """
+        with self._write_lock:
+            depth = getattr(self._tx, 'depth', 0)
+            if depth == 0:
+                self._tx.stale_keywords = set()
+                self._tx.stale_jobs = set()
+            self._tx.depth = depth + 1
+            try:
+                yield
+            except Exception:
+                self._tx.depth = depth
+                if depth == 0:
+                    self.conn.rollback()
+                    # Cached keywords/jobs may include rows that were just rolled back
+                    self._invalidate_keyword_cache()
+                    self._invalidate_jobs()
+                raise
+            self._tx.depth = depth
+            if depth == 0:
+                self.conn.commit()
+                # A pooled reader may have cached the pre-commit rows after the in-transaction
+                # invalidation; drop them again now that the new rows are visible
+                for user_id in self._tx.stale_keywords:
+                    self._invalidate_keyword_cache(user_id)
+                if self._tx.stale_jobs:
+                    self._invalidate_jobs(self._tx.stale_jobs)
+
+    @contextmanager
+    def _writer(self):
+        """Yield a cursor on the write connection; commits on exit (see transaction())."""
+        with self.transaction():
+            yield self.conn.cursor()
+
+    @contextmanager
+    def _reader(self):
+        """Yield a cursor for a read.
+
+        Uses a pooled read-only connection, except inside transaction() where reads must go
+        through the write connection to see the block's uncommitted rows.
+        """
+        if self._pool is None or getattr(self._tx, 'depth', 0):
+            yield self.conn.cursor()
+        else:
+            with self._pool.reader() as cursor:
+                yield cursor
     
     def create_tables(self):
         """Create all necessary tables."""
@@ -105,11 +226,6 @@ class Database:
             )
         """)
         
-        # Create indexes
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_keywords_user ON user_keywords(user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_user ON interactions(user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_job ON interactions(job_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_digest_time ON users(next_digest_at)")
         # Daily cache table for small globally-shared values (e.g., today's encouragement message)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS daily_cache (
@@ -119,9 +235,9 @@ class Database:
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_cache_date ON daily_cache(cache_date)")
         
         self.conn.commit()
+        self.create_indexes()
         # Ensure 'source' column exists for compatibility with older DBs
         cursor.execute("PRAGMA table_info(user_keywords)")
         cols = [row[1] for row in cursor.fetchall()]
@@ -143,160 +259,172 @@ class Database:
         """)
         self.conn.commit()
 
+    def create_indexes(self):
+        """Create the secondary indexes (idempotent)."""
+        with self._writer() as cursor:
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_keywords_user ON user_keywords(user_id)")
+            # (user_id, timestamp) ranges answer the recent-interaction queries; action and job_id ride
+            # along so get_recently_shown_jobs never touches the table
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_user_ts ON interactions(user_id, timestamp, action, job_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_interactions_job ON interactions(job_id)")
+            # Only users with notifications on are ever due for a digest
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_digest_active ON users(next_digest_at) WHERE notifications_enabled = 1")
+            # Superseded by the two indexes above
+            cursor.execute("DROP INDEX IF EXISTS idx_interactions_user")
+            cursor.execute("DROP INDEX IF EXISTS idx_users_digest_time")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_cache_date ON daily_cache(cache_date)")
+
     # Daily cache helpers
     def get_daily_cache(self, cache_key: str, expected_date: str):
         """Return cached value for key if it exists for expected_date, else None."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT cache_value FROM daily_cache WHERE cache_key = ? AND cache_date = ?", (cache_key, expected_date))
-        row = cursor.fetchone()
-        return row[0] if row else None
+        with self._reader() as cursor:
+            cursor.execute("SELECT cache_value FROM daily_cache WHERE cache_key = ? AND cache_date = ?", (cache_key, expected_date))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def get_cache_value(self, cache_key: str) -> Optional[str]:
+        """Return the cached value for key regardless of its date, else None."""
+        with self._reader() as cursor:
+            cursor.execute("SELECT cache_value FROM daily_cache WHERE cache_key = ?", (cache_key,))
+            row = cursor.fetchone()
+            return row[0] if row else None
 
     def set_daily_cache(self, cache_key: str, cache_value: str, cache_date: str):
         """Set or update a cached value for a given date.
 
         Uses an upsert so updates replace previous entries.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO daily_cache (cache_key, cache_value, cache_date)
-            VALUES (?, ?, ?)
-            ON CONFLICT(cache_key) DO UPDATE SET
-                cache_value = excluded.cache_value,
-                cache_date = excluded.cache_date,
-                created_at = CURRENT_TIMESTAMP
-        """, (cache_key, cache_value, cache_date))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                INSERT INTO daily_cache (cache_key, cache_value, cache_date)
+                VALUES (?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    cache_value = excluded.cache_value,
+                    cache_date = excluded.cache_date,
+                    created_at = CURRENT_TIMESTAMP
+            """, (cache_key, cache_value, cache_date))
 
     def cleanup_old_cache(self, days_to_keep: int = 7):
         """Remove cache entries older than days_to_keep to prevent table growth."""
-        cursor = self.conn.cursor()
         cutoff = (datetime.now() - timedelta(days=days_to_keep)).date().isoformat()
-        cursor.execute("DELETE FROM daily_cache WHERE cache_date < ?", (cutoff,))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("DELETE FROM daily_cache WHERE cache_date < ?", (cutoff,))
     
     # User operations
     def create_user(self, user_id: int, username: str = None, prefs: dict = None) -> bool:
         """Create a new user."""
-        cursor = self.conn.cursor()
-        try:
-            prefs_json = json.dumps(prefs or {})
-            # Calculate next digest time (default 9:00 AM next day)
-            next_digest = self._calculate_next_digest(config.DEFAULT_NOTIFICATION_TIME)
-            
-            cursor.execute("""
-                INSERT INTO users (user_id, tg_username, prefs_json, 
-                                 notifications_enabled, notification_time, next_digest_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (user_id, username, prefs_json, 
-                  1 if config.DEFAULT_NOTIFICATIONS else 0,
-                  config.DEFAULT_NOTIFICATION_TIME,
-                  next_digest))
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
+        prefs_json = json.dumps(prefs or {})
+        # Calculate next digest time (default 9:00 AM next day)
+        next_digest = self._calculate_next_digest(config.DEFAULT_NOTIFICATION_TIME)
+        with self._writer() as cursor:
+            try:
+                cursor.execute("""
+                    INSERT INTO users (user_id, tg_username, prefs_json, 
+                                     notifications_enabled, notification_time, next_digest_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (user_id, username, prefs_json, 
+                      1 if config.DEFAULT_NOTIFICATIONS else 0,
+                      config.DEFAULT_NOTIFICATION_TIME,
+                      next_digest))
+            except sqlite3.IntegrityError:
+                return False
+        return True
     
     def get_user(self, user_id: int) -> Optional[Dict]:
         """Get user by ID."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-        row = cursor.fetchone()
-        if row:
-            return dict(row)
-        return None
+        with self._reader() as cursor:
+            cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+            row = cursor.fetchone()
+            if row:
+                return dict(row)
+            return None
     
     def update_user_prefs(self, user_id: int, prefs: dict):
         """Update user preferences."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE users 
-            SET prefs_json = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = ?
-        """, (json.dumps(prefs), user_id))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                UPDATE users 
+                SET prefs_json = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            """, (json.dumps(prefs), user_id))
 
     def update_user_min_salary(self, user_id: int, min_salary: int):
         """Set user's monthly min salary preference (SGD). Use NULL to clear."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE users SET min_salary_preference = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = ?
-        """, (min_salary, user_id))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                UPDATE users SET min_salary_preference = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            """, (min_salary, user_id))
 
     def get_user_min_salary(self, user_id: int) -> Optional[int]:
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT min_salary_preference FROM users WHERE user_id = ?", (user_id,))
-        row = cursor.fetchone()
-        if row:
-            return row[0]
-        return None
+        with self._reader() as cursor:
+            cursor.execute("SELECT min_salary_preference FROM users WHERE user_id = ?", (user_id,))
+            row = cursor.fetchone()
+            if row:
+                return row[0]
+            return None
 
     def wait_for_rate_limit(self, api_name: str, max_requests: int, window_seconds: int = 60) -> int:
         """Ensure a maximum of `max_requests` in `window_seconds` window for the given api_name.
         Returns seconds waited (0 if no wait).
         """
-        cursor = self.conn.cursor()
         now = datetime.now().timestamp()
-        cursor.execute("SELECT window_start, request_count FROM api_rate_limit WHERE api_name = ?", (api_name,))
-        row = cursor.fetchone()
-        if not row:
-            cursor.execute("INSERT INTO api_rate_limit (api_name, window_start, request_count) VALUES (?, ?, 1)", (api_name, now))
-            self.conn.commit()
-            return 0
-
-        window_start, count = row
-        # window_start can be None if reset earlier
-        if window_start is None:
-            window_start = now
-
-        elapsed = now - window_start
-        if elapsed >= window_seconds:
-            # Reset window and count this request
-            cursor.execute("UPDATE api_rate_limit SET window_start = ?, request_count = 1 WHERE api_name = ?", (now, api_name))
-            self.conn.commit()
-            return 0
-
-        if count < max_requests:
-            # Increment count for this request
-            cursor.execute("UPDATE api_rate_limit SET request_count = request_count + 1 WHERE api_name = ?", (api_name,))
-            self.conn.commit()
-            return 0
-
-        # Need to wait until window resets - return wait time, do NOT sleep here
-        wait_seconds = int(window_seconds - elapsed) + 1
-        return wait_seconds
+        # Read and bump the counter under the write lock so concurrent callers can't both pass
+        with self._writer() as cursor:
+            cursor.execute("SELECT window_start, request_count FROM api_rate_limit WHERE api_name = ?", (api_name,))
+            row = cursor.fetchone()
+            if not row:
+                cursor.execute("INSERT INTO api_rate_limit (api_name, window_start, request_count) VALUES (?, ?, 1)", (api_name, now))
+                return 0
+
+            window_start, count = row
+            # window_start can be None if reset earlier
+            if window_start is None:
+                window_start = now
+
+            elapsed = now - window_start
+            if elapsed >= window_seconds:
+                # Reset window and count this request
+                cursor.execute("UPDATE api_rate_limit SET window_start = ?, request_count = 1 WHERE api_name = ?", (now, api_name))
+                return 0
+
+            if count < max_requests:
+                # Increment count for this request
+                cursor.execute("UPDATE api_rate_limit SET request_count = request_count + 1 WHERE api_name = ?", (api_name,))
+                return 0
+
+            # Need to wait until window resets - return wait time, do NOT sleep here
+            wait_seconds = int(window_seconds - elapsed) + 1
+            return wait_seconds
     
     def toggle_notifications(self, user_id: int) -> bool:
         """Toggle user notifications. Returns new state."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT notifications_enabled FROM users WHERE user_id = ?", (user_id,))
-        row = cursor.fetchone()
-        if row:
+        with self._writer() as cursor:
+            cursor.execute("SELECT notifications_enabled FROM users WHERE user_id = ?", (user_id,))
+            row = cursor.fetchone()
+            if not row:
+                return False
             new_state = 0 if row[0] else 1
             cursor.execute("""
                 UPDATE users 
                 SET notifications_enabled = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE user_id = ?
             """, (new_state, user_id))
-            self.conn.commit()
-            return bool(new_state)
-        return False
+        return bool(new_state)
     
     def set_notification_time(self, user_id: int, time_str: str):
         """Set user notification time and recalculate next digest."""
         next_digest = self._calculate_next_digest(time_str)
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE users 
-            SET notification_time = ?, next_digest_at = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = ?
-        """, (time_str, next_digest, user_id))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                UPDATE users 
+                SET notification_time = ?, next_digest_at = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            """, (time_str, next_digest, user_id))
     
     def _calculate_next_digest(self, time_str: str) -> str:
         """Calculate next digest datetime based on notification time."""
-        now = datetime.now(timezone(config.DEFAULT_TIMEZONE))
+        now = datetime.now(config.TZ)
         hour, minute = map(int, time_str.split(':'))
         
         # Set to today at notification time (localized)
@@ -310,29 +438,28 @@ class Database:
     
     def get_users_for_digest(self) -> List[Dict]:
         """Get users who are due for daily digest."""
-        cursor = self.conn.cursor()
-        now = datetime.now(timezone(config.DEFAULT_TIMEZONE)).isoformat()
-        cursor.execute("""
-            SELECT * FROM users 
-            WHERE notifications_enabled = 1 
-            AND next_digest_at <= ?
-        """, (now,))
-        return [dict(row) for row in cursor.fetchall()]
+        now = datetime.now(config.TZ).isoformat()
+        with self._reader() as cursor:
+            cursor.execute("""
+                SELECT * FROM users 
+                WHERE notifications_enabled = 1 
+                AND next_digest_at <= ?
+            """, (now,))
+            return [dict(row) for row in cursor.fetchall()]
     
     def update_next_digest(self, user_id: int):
         """Advance user's next digest by 24 hours."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT next_digest_at, notification_time FROM users WHERE user_id = ?", (user_id,))
-        row = cursor.fetchone()
-        if row and row[0]:
-            current_digest = datetime.fromisoformat(row[0])
-            next_digest = current_digest + timedelta(days=1)
-            cursor.execute("""
-                UPDATE users 
-                SET next_digest_at = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = ?
-            """, (next_digest.isoformat(), user_id))
-            self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("SELECT next_digest_at, notification_time FROM users WHERE user_id = ?", (user_id,))
+            row = cursor.fetchone()
+            if row and row[0]:
+                current_digest = datetime.fromisoformat(row[0])
+                next_digest = current_digest + timedelta(days=1)
+                cursor.execute("""
+                    UPDATE users 
+                    SET next_digest_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ?
+                """, (next_digest.isoformat(), user_id))
 
     def reserve_due_users_for_digest(self, now_iso: str) -> List[Dict]:
         """Atomically reserve users who are due for digest and advance their next_digest_at by 1 day.
@@ -340,110 +467,197 @@ class Database:
         This method uses an immediate transaction to prevent race conditions when multiple
         scheduler instances attempt to reserve the same users. Returns the list of user records reserved.
         """
-        cursor = self.conn.cursor()
-        users = []
-        try:
-            # Start immediate transaction to acquire write lock
-            cursor.execute("BEGIN IMMEDIATE")
-            cursor.execute(
-                "SELECT user_id, next_digest_at FROM users WHERE notifications_enabled = 1 AND next_digest_at <= ?",
-                (now_iso,)
-            )
-            rows = cursor.fetchall()
-            if not rows:
-                cursor.execute("COMMIT")
-                return []
-
-            # Advance each user's next_digest_at by 1 day (calculate with Python to preserve ISO tz info)
-            user_ids = []
-            for r in rows:
-                uid = r[0]
-                nd = r[1]
-                if not nd:
-                    continue
-                current_digest = datetime.fromisoformat(nd)
-                next_digest = (current_digest + timedelta(days=1)).isoformat()
+        # Other threads' writes would otherwise land inside this BEGIN IMMEDIATE ... COMMIT
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            users = []
+            try:
+                # Start immediate transaction to acquire write lock
+                cursor.execute("BEGIN IMMEDIATE")
                 cursor.execute(
+                    "SELECT * FROM users WHERE notifications_enabled = 1 AND next_digest_at <= ?",
+                    (now_iso,)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    cursor.execute("COMMIT")
+                    return []
+
+                # Advance each user's next_digest_at by 1 day (calculate with Python to preserve ISO tz info)
+                updates = []
+                for r in rows:
+                    nd = r['next_digest_at']
+                    if not nd:
+                        continue
+                    user = dict(r)
+                    user['next_digest_at'] = (datetime.fromisoformat(nd) + timedelta(days=1)).isoformat()
+                    users.append(user)
+                    updates.append((user['next_digest_at'], user['user_id']))
+                cursor.executemany(
                     "UPDATE users SET next_digest_at = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
-                    (next_digest, uid)
+                    updates
                 )
-                user_ids.append(uid)
 
-            # Commit transaction
-            cursor.execute("COMMIT")
+                # Commit transaction
+                cursor.execute("COMMIT")
 
-            # Return full user records
-            users = []
-            for uid in user_ids:
-                cursor.execute("SELECT * FROM users WHERE user_id = ?", (uid,))
-                row = cursor.fetchone()
-                if row:
-                    users.append(dict(row))
-            return users
+                # Return the reserved user records (already carrying the advanced next_digest_at)
+                return users
 
-        except Exception:
-            cursor.execute("ROLLBACK")
-            raise
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
     
     # Keyword operations
+    def _invalidate_keyword_cache(self, user_id: int = None):
+        """Drop cached keywords for one user (or everyone when user_id is None).
+
+        Inside transaction() the drop is repeated after the outermost commit.
+        """
+        with self._keyword_cache_lock:
+            self._keyword_cache_generation += 1
+            if user_id is None:
+                self._keyword_cache.clear()
+            else:
+                self._keyword_cache.pop(user_id, None)
+        if getattr(self._tx, 'depth', 0):
+            self._tx.stale_keywords.add(user_id)
+
+    @staticmethod
+    def _keyword_cache_entry(expires_at: float, rows: List[Dict]) -> Tuple[float, List[Dict], Dict[str, Dict], int]:
+        """Build a keyword cache entry, indexing the rows by keyword and counting positive manual ones."""
+        manual_count = sum(1 for row in rows if row.get('source') == 'manual' and not row['is_negative'])
+        return expires_at, rows, {row['keyword']: row for row in rows}, manual_count
+
+    def _cached_keywords(self, user_id: int) -> Optional[Tuple[float, List[Dict], Dict[str, Dict], int]]:
+        """Return the user's keyword cache entry, loading it on a miss; None when the cache is off.
+
+        The rows are shared with the cache and must not be mutated.
+        """
+        ttl = config.KEYWORD_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return None
+        with self._keyword_cache_lock:
+            entry = self._keyword_cache.get(user_id)
+            generation = self._keyword_cache_generation
+        if entry is not None and entry[0] > time.monotonic():
+            return entry
+        with self._reader() as cursor:
+            cursor.execute("SELECT * FROM user_keywords WHERE user_id = ? ORDER BY weight DESC", (user_id,))
+            rows = [dict(row) for row in cursor.fetchall()]
+        entry = self._keyword_cache_entry(time.monotonic() + ttl, rows)
+        # Rows read inside a transaction may be uncommitted; don't share them through the cache
+        if not getattr(self._tx, 'depth', 0):
+            with self._keyword_cache_lock:
+                if generation == self._keyword_cache_generation:
+                    self._keyword_cache[user_id] = entry
+        return entry
+
     def get_user_keywords(self, user_id: int, top_k: int = None) -> List[Dict]:
-        """Get user keywords sorted by weight."""
-        cursor = self.conn.cursor()
-        query = """
-            SELECT * FROM user_keywords 
-            WHERE user_id = ? 
-            ORDER BY weight DESC
+        """Get user keywords sorted by weight.
+
+        The full list is cached per user for KEYWORD_CACHE_TTL_SECONDS and invalidated by
+        every keyword write; callers always receive fresh dict copies they may mutate.
         """
-        if top_k:
-            query += f" LIMIT {top_k}"
-        
-        cursor.execute(query, (user_id,))
-        return [dict(row) for row in cursor.fetchall()]
+        entry = self._cached_keywords(user_id)
+        if entry is not None:
+            rows = entry[1]
+            if top_k:
+                rows = rows[:top_k]
+            return [dict(row) for row in rows]
+
+        with self._reader() as cursor:
+            # LIMIT is bound (-1 = no limit) so every top_k shares one prepared statement
+            cursor.execute("""
+                SELECT * FROM user_keywords 
+                WHERE user_id = ? 
+                ORDER BY weight DESC
+                LIMIT ?
+            """, (user_id, top_k or -1))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def prime_keyword_cache(self, user_ids: List[int]):
+        """Load several users' keyword lists with one query per 500 users and cache them.
+
+        Used before a digest fan-out so each user's get_user_keywords() is a cache hit. No-op when
+        the keyword cache is disabled.
+        """
+        ttl = config.KEYWORD_CACHE_TTL_SECONDS
+        if ttl <= 0 or not user_ids:
+            return
+        with self._keyword_cache_lock:
+            generation = self._keyword_cache_generation
+        rows_by_user: Dict[int, List[Dict]] = {user_id: [] for user_id in user_ids}
+        with self._reader() as cursor:
+            for i in range(0, len(user_ids), 500):
+                chunk = user_ids[i:i + 500]
+                cursor.execute(
+                    f"SELECT * FROM user_keywords WHERE user_id IN ({','.join('?' * len(chunk))}) ORDER BY user_id, weight DESC",
+                    chunk
+                )
+                for row in cursor.fetchall():
+                    rows_by_user[row['user_id']].append(dict(row))
+        expires_at = time.monotonic() + ttl
+        with self._keyword_cache_lock:
+            # Skip caching if a keyword write raced the read
+            if generation == self._keyword_cache_generation:
+                for user_id, rows in rows_by_user.items():
+                    self._keyword_cache[user_id] = self._keyword_cache_entry(expires_at, rows)
+    
+    def get_keyword_choices(self, user_id: int) -> List[Tuple[int, str, str]]:
+        """Get (id, keyword, source) tuples sorted by weight, for building keyword pickers."""
+        with self._reader() as cursor:
+            cursor.execute("""
+                SELECT id, keyword, COALESCE(source, 'auto') FROM user_keywords
+                WHERE user_id = ?
+                ORDER BY weight DESC
+            """, (user_id,))
+            return [tuple(row) for row in cursor.fetchall()]
     
     def upsert_keyword(self, user_id: int, keyword: str, weight: float, 
                       is_negative: bool = False, rationale: str = None, source: str = 'auto'):
         """Insert or update a keyword."""
-        cursor = self.conn.cursor()
         # If inserting or updating, avoid auto-generated updates overwriting manual keywords.
         # If existing source is 'manual' and new source is 'auto', keep existing values.
         # Enforce manual keywords are always positive
         if source == 'manual':
             is_negative = False
 
-        cursor.execute("""
-            INSERT INTO user_keywords (user_id, keyword, weight, is_negative, rationale, source)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ON CONFLICT(user_id, keyword)
-            DO UPDATE SET
-                weight = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN weight ELSE excluded.weight END,
-                is_negative = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN is_negative ELSE excluded.is_negative END,
-                rationale = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN rationale ELSE excluded.rationale END,
-                source = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN source ELSE excluded.source END,
-                updated_at = CURRENT_TIMESTAMP
-        """, (user_id, keyword.lower(), weight, 1 if is_negative else 0, rationale, source))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                INSERT INTO user_keywords (user_id, keyword, weight, is_negative, rationale, source)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, keyword)
+                DO UPDATE SET
+                    weight = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN weight ELSE excluded.weight END,
+                    is_negative = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN is_negative ELSE excluded.is_negative END,
+                    rationale = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN rationale ELSE excluded.rationale END,
+                    source = CASE WHEN source = 'manual' AND excluded.source = 'auto' THEN source ELSE excluded.source END,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (user_id, keyword.lower(), weight, 1 if is_negative else 0, rationale, source))
+        self._invalidate_keyword_cache(user_id)
     
     def update_keyword_weight(self, user_id: int, keyword: str, delta: float):
         """Update keyword weight by delta."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            UPDATE user_keywords 
-            SET weight = weight + ?, 
-                is_negative = CASE WHEN (weight + ?) < ? THEN 1 ELSE 0 END,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = ? AND keyword = ?
-        """, (delta, delta, config.NEGATIVE_PROMOTE_AT, user_id, keyword.lower()))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                UPDATE user_keywords 
+                SET weight = weight + ?, 
+                    is_negative = CASE WHEN (weight + ?) < ? THEN 1 ELSE 0 END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND keyword = ?
+            """, (delta, delta, config.NEGATIVE_PROMOTE_AT, user_id, keyword.lower()))
+        self._invalidate_keyword_cache(user_id)
     
     def delete_keywords(self, user_id: int, keywords: List[str]):
         """Delete specific keywords."""
-        cursor = self.conn.cursor()
         placeholders = ','.join('?' * len(keywords))
-        cursor.execute(f"""
-            DELETE FROM user_keywords 
-            WHERE user_id = ? AND keyword IN ({placeholders})
-        """, [user_id] + [k.lower() for k in keywords])
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute(f"""
+                DELETE FROM user_keywords 
+                WHERE user_id = ? AND keyword IN ({placeholders})
+            """, [user_id] + [k.lower() for k in keywords])
+        self._invalidate_keyword_cache(user_id)
 
     def delete_keyword(self, user_id: int, keyword: str):
         """Delete a single keyword for user."""
@@ -451,72 +665,100 @@ class Database:
 
     def get_keyword_by_id(self, user_id: int, keyword_id: int) -> Optional[Dict]:
         """Get a keyword row by its id for a given user."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM user_keywords WHERE id = ? AND user_id = ?", (keyword_id, user_id))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        with self._reader() as cursor:
+            cursor.execute("SELECT * FROM user_keywords WHERE id = ? AND user_id = ?", (keyword_id, user_id))
+            row = cursor.fetchone()
+            return dict(row) if row else None
 
     def delete_keyword_by_id(self, user_id: int, keyword_id: int):
         """Delete a keyword by its id for a given user."""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM user_keywords WHERE id = ? AND user_id = ?", (keyword_id, user_id))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("DELETE FROM user_keywords WHERE id = ? AND user_id = ?", (keyword_id, user_id))
+        self._invalidate_keyword_cache(user_id)
 
     def clear_auto_keywords(self, user_id: int):
         """Delete all auto-generated keywords for the user."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            DELETE FROM user_keywords
-            WHERE user_id = ? AND (source IS NULL OR source != 'manual')
-        """, (user_id,))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                DELETE FROM user_keywords
+                WHERE user_id = ? AND (source IS NULL OR source != 'manual')
+            """, (user_id,))
+        self._invalidate_keyword_cache(user_id)
 
     def clear_manual_keywords(self, user_id: int):
         """Delete all manual keywords for the user."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            DELETE FROM user_keywords
-            WHERE user_id = ? AND source = 'manual'
-        """, (user_id,))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                DELETE FROM user_keywords
+                WHERE user_id = ? AND source = 'manual'
+            """, (user_id,))
+        self._invalidate_keyword_cache(user_id)
+    
+    def clear_all_keywords(self, user_id: int):
+        """Delete all keywords (manual and auto) for the user."""
+        with self._writer() as cursor:
+            cursor.execute("DELETE FROM user_keywords WHERE user_id = ?", (user_id,))
+        self._invalidate_keyword_cache(user_id)
     
     def decay_keywords(self, user_id: int, decay_factor: float):
         """Apply decay to all keywords."""
-        cursor = self.conn.cursor()
-        # Do not decay manual keywords (they have fixed weight)
-        cursor.execute("""
-            UPDATE user_keywords 
-            SET weight = weight * ?, updated_at = CURRENT_TIMESTAMP
-            WHERE user_id = ? AND (source IS NULL OR source != 'manual')
-        """, (decay_factor, user_id))
-        self.conn.commit()
+        with self._writer() as cursor:
+            # Do not decay manual keywords (they have fixed weight)
+            cursor.execute("""
+                UPDATE user_keywords 
+                SET weight = weight * ?, updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND (source IS NULL OR source != 'manual')
+            """, (decay_factor, user_id))
+        self._invalidate_keyword_cache(user_id)
+
+    def get_user_profile(self, user_id: int, top_k: int = None) -> Tuple[Optional[Dict], List[Dict], int]:
+        """Return (user, keywords sorted by weight, positive manual keyword count) in one call.
+
+        The manual count comes with the cached keyword list rather than from a separate COUNT query.
+        """
+        user = self.get_user(user_id)
+        entry = self._cached_keywords(user_id)
+        if entry is None:
+            return user, self.get_user_keywords(user_id, top_k=top_k), self.count_manual_keywords(user_id)
+        rows = entry[1][:top_k] if top_k else entry[1]
+        return user, [dict(row) for row in rows], entry[3]
+
+    def get_keyword_and_manual_count(self, user_id: int, keyword: str) -> Tuple[Optional[Dict], int]:
+        """Return (the user's row for keyword or None, positive manual keyword count).
+
+        Both come from the user's cached keyword entry (a dict lookup, no scan), for the
+        add-manual-keyword checks; with the cache off they are indexed queries.
+        """
+        entry = self._cached_keywords(user_id)
+        if entry is None:
+            with self._reader() as cursor:
+                # Uses the UNIQUE(user_id, keyword) index
+                cursor.execute("SELECT * FROM user_keywords WHERE user_id = ? AND keyword = ?", (user_id, keyword))
+                row = cursor.fetchone()
+            return (dict(row) if row else None), self.count_manual_keywords(user_id)
+        existing = entry[2].get(keyword)
+        return (dict(existing) if existing else None), entry[3]
 
     def count_manual_keywords(self, user_id: int, positive_only: bool = True) -> int:
         """Return the count of manual keywords for a user. Optionally only positive ones."""
-        cursor = self.conn.cursor()
-        if positive_only:
-            cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND source = 'manual' AND is_negative = 0", (user_id,))
-        else:
-            cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND source = 'manual'", (user_id,))
-        return cursor.fetchone()[0]
+        with self._reader() as cursor:
+            if positive_only:
+                cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND source = 'manual' AND is_negative = 0", (user_id,))
+            else:
+                cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND source = 'manual'", (user_id,))
+            return cursor.fetchone()[0]
 
     def count_auto_keywords(self, user_id: int, positive_only: bool = True) -> int:
         """Return the count of auto-generated keywords for a user. Optionally only positive ones."""
-        cursor = self.conn.cursor()
-        if positive_only:
-            cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND (source IS NULL OR source != 'manual') AND is_negative = 0", (user_id,))
-        else:
-            cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND (source IS NULL OR source != 'manual')", (user_id,))
-        return cursor.fetchone()[0]
+        with self._reader() as cursor:
+            if positive_only:
+                cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND (source IS NULL OR source != 'manual') AND is_negative = 0", (user_id,))
+            else:
+                cursor.execute("SELECT COUNT(*) FROM user_keywords WHERE user_id = ? AND (source IS NULL OR source != 'manual')", (user_id,))
+            return cursor.fetchone()[0]
     
     # Job operations
-    def upsert_job(self, job_data: Dict):
-        """Insert or update a job."""
-        cursor = self.conn.cursor()
-        # Ensure we have a safe title to avoid NOT NULL constraint failure
-        title_safe = job_data.get('title') or (job_data.get('job', {}) or {}).get('Title') or (job_data.get('job', {}) or {}).get('title') or 'Unknown'
-        try:
-            cursor.execute("""
+    _UPSERT_JOB_SQL = """
             INSERT INTO jobs (job_id, title, company, location, description, 
                             url, salary_min, salary_max, salary_currency, salary_interval, salary_display_text, salary_hidden,
                             category_json, employment_type_json, work_arrangement, mrt_stations_json, skills_json,
@@ -549,11 +791,28 @@ class Database:
                 source = excluded.source,
                 posted_at = excluded.posted_at,
                 fetched_at = CURRENT_TIMESTAMP
-        """, (
+        """
+
+    @staticmethod
+    def _job_title_safe(job_data: Dict) -> str:
+        # Ensure we have a safe title to avoid NOT NULL constraint failure
+        return job_data.get('title') or (job_data.get('job', {}) or {}).get('Title') or (job_data.get('job', {}) or {}).get('title') or 'Unknown'
+
+    @staticmethod
+    def _display_name(value):
+        """Company/location may be a plain string or a {'display_name': ...} dict."""
+        if isinstance(value, dict):
+            return value.get('display_name') or None
+        return value or (value if isinstance(value, str) else None)
+
+    @classmethod
+    def _job_params(cls, job_data: Dict) -> Tuple:
+        """Build the parameter tuple for _UPSERT_JOB_SQL from a normalized job dict."""
+        return (
             job_data.get('id') or job_data.get('job_id') or job_data.get('job', {}).get('id') or job_data.get('job', {}).get('sid'),
-            title_safe,
-            (job_data.get('company', {}).get('display_name') if isinstance(job_data.get('company'), dict) else job_data.get('company')) or (job_data.get('company') if isinstance(job_data.get('company'), str) else None),
-            (job_data.get('location', {}).get('display_name') if isinstance(job_data.get('location'), dict) else job_data.get('location')) or (job_data.get('location') if isinstance(job_data.get('location'), str) else None),
+            cls._job_title_safe(job_data),
+            cls._display_name(job_data.get('company')),
+            cls._display_name(job_data.get('location')),
             job_data.get('description'),
             job_data.get('url') or job_data.get('redirect_url'),
             job_data.get('salary_min'),
@@ -575,72 +834,140 @@ class Database:
             job_data.get('expiration_date'),
             job_data.get('source'),
             job_data.get('created')
-        ))
-            self.conn.commit()
+        )
+
+    def _invalidate_jobs(self, job_ids=None):
+        """Drop cached job rows (all of them when job_ids is None).
+
+        Inside transaction() the drop is repeated after the outermost commit.
+        """
+        with self._job_cache_lock:
+            self._job_cache_generation += 1
+            if job_ids is None:
+                self._job_cache.clear()
+            else:
+                for job_id in job_ids:
+                    self._job_cache.pop(job_id, None)
+        if job_ids is not None and getattr(self._tx, 'depth', 0):
+            self._tx.stale_jobs.update(job_ids)
+
+    def _upsert_job_row(self, cursor, job_data: Dict):
+        """Execute the upsert for one job; IntegrityErrors are logged and skipped."""
+        try:
+            cursor.execute(self._UPSERT_JOB_SQL, self._job_params(job_data))
         except sqlite3.IntegrityError as e:
             # Log and re-raise or ignore depending on policy; for now, log and skip
             logger = logging.getLogger(__name__)
-            logger.warning("Failed to upsert job (IntegrityError): %s - job_id=%s, title=%s", e, job_data.get('id'), title_safe)
-        except Exception:
-            # Re-raise unexpected exceptions to surface them during development
-            raise
+            logger.warning("Failed to upsert job (IntegrityError): %s - job_id=%s, title=%s", e, job_data.get('id'), self._job_title_safe(job_data))
+
+    def upsert_job(self, job_data: Dict):
+        """Insert or update a job."""
+        self.upsert_jobs([job_data])
+
+    def upsert_jobs(self, jobs: List[Dict]):
+        """Insert or update several jobs with one executemany and a single commit.
+
+        If a row violates a constraint the batch is redone row by row, so only the bad
+        jobs are skipped (re-running the upsert for rows already written is harmless).
+        """
+        if not jobs:
+            return
+        rows = [self._job_params(job_data) for job_data in jobs]
+        with self._writer() as cursor:
+            self._invalidate_jobs([row[0] for row in rows])
+            try:
+                cursor.executemany(self._UPSERT_JOB_SQL, rows)
+            except sqlite3.IntegrityError:
+                for job_data in jobs:
+                    self._upsert_job_row(cursor, job_data)
     
     def get_job(self, job_id: str) -> Optional[Dict]:
-        """Get job by ID."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
-        row = cursor.fetchone()
-        if row:
-            return dict(row)
-        return None
+        """Get job by ID (served from a bounded in-memory LRU when possible; returns a copy)."""
+        max_entries = config.JOB_CACHE_MAX_ENTRIES
+        if max_entries > 0:
+            with self._job_cache_lock:
+                cached = self._job_cache.get(job_id)
+                if cached is not None:
+                    self._job_cache.move_to_end(job_id)
+                    return dict(cached)
+                generation = self._job_cache_generation
+        with self._reader() as cursor:
+            cursor.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        if max_entries > 0:
+            with self._job_cache_lock:
+                # Skip caching if an upsert raced the read, or the row may be uncommitted
+                if generation == self._job_cache_generation and not getattr(self._tx, 'depth', 0):
+                    self._job_cache[job_id] = job
+                    while len(self._job_cache) > max_entries:
+                        self._job_cache.popitem(last=False)
+            return dict(job)
+        return job
     
     # Interaction operations
     def log_interaction(self, user_id: int, job_id: str, action: str):
         """Log user interaction with a job."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO interactions (user_id, job_id, action)
-            VALUES (?, ?, ?)
-        """, (user_id, job_id, action))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("""
+                INSERT INTO interactions (user_id, job_id, action)
+                VALUES (?, ?, ?)
+            """, (user_id, job_id, action))
+
+    def log_interactions(self, user_id: int, job_ids: List[str], action: str):
+        """Log the same interaction for several jobs in one statement and commit."""
+        if not job_ids:
+            return
+        with self._writer() as cursor:
+            cursor.executemany("""
+                INSERT INTO interactions (user_id, job_id, action)
+                VALUES (?, ?, ?)
+            """, [(user_id, job_id, action) for job_id in job_ids])
     
     def get_user_interactions(self, user_id: int, action: str = None, 
                             days: int = 7) -> List[Dict]:
         """Get user interactions, optionally filtered by action and date."""
-        cursor = self.conn.cursor()
         cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-        
         query = "SELECT * FROM interactions WHERE user_id = ? AND timestamp >= ?"
         params = [user_id, cutoff]
-        
         if action:
             query += " AND action = ?"
             params.append(action)
-        
         query += " ORDER BY timestamp DESC"
-        
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        with self._reader() as cursor:
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
     
-    def get_recently_shown_jobs(self, user_id: int, days: int = 7) -> List[str]:
+    def get_recently_shown_jobs(self, user_id: int, days: int = 7, job_ids: List[str] = None) -> List[str]:
         """Get job IDs that user has interacted with recently (shown, liked, or disliked).
         
         This excludes any jobs that were shown to the user in the last N days,
-        ensuring variety in recommendations.
+        ensuring variety in recommendations. Pass job_ids to only check those candidates
+        (the filter runs in SQL, so the user's whole recent history isn't loaded).
         """
-        cursor = self.conn.cursor()
         cutoff = (datetime.now() - timedelta(days=days)).isoformat()
-        cursor.execute("""
+        query = """
             SELECT DISTINCT job_id FROM interactions 
             WHERE user_id = ? AND timestamp >= ? AND action IN ('shown', 'like', 'dislike')
-        """, (user_id, cutoff))
-        return [row[0] for row in cursor.fetchall()]
+        """
+        if job_ids is None:
+            with self._reader() as cursor:
+                cursor.execute(query, (user_id, cutoff))
+                return [row[0] for row in cursor.fetchall()]
+        recent = []
+        with self._reader() as cursor:
+            for i in range(0, len(job_ids), 500):
+                chunk = job_ids[i:i + 500]
+                cursor.execute(f"{query} AND job_id IN ({','.join('?' * len(chunk))})", [user_id, cutoff, *chunk])
+                recent.extend(row[0] for row in cursor.fetchall())
+        return recent
 
     def clear_user_interactions(self, user_id: int):
         """Delete all interactions for a user."""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,))
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,))
 
     def reset_user_profile(self, user_id: int, keep_settings: bool = True):
         """Reset user profile by clearing keywords and interaction history.
@@ -650,37 +977,43 @@ class Database:
             keep_settings: If True, preserve notification enabled flag and prefs_json,
                           but still reset notification_time and min_salary_preference to defaults
         """
-        cursor = self.conn.cursor()
-        # Delete user keywords
-        cursor.execute("DELETE FROM user_keywords WHERE user_id = ?", (user_id,))
-        # Delete user interactions
-        cursor.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,))
-        if keep_settings:
-            # Reset notification_time and min_salary_preference to defaults, keep notifications_enabled and prefs_json
-            cursor.execute("UPDATE users SET notification_time = ?, min_salary_preference = NULL, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?", (config.DEFAULT_NOTIFICATION_TIME, user_id))
-        else:
-            # Reset prefs_json to empty and clear notification settings
-            cursor.execute("UPDATE users SET prefs_json = ?, notifications_enabled = ?, notification_time = ?, min_salary_preference = NULL, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?", (json.dumps({}), 1 if config.DEFAULT_NOTIFICATIONS else 0, config.DEFAULT_NOTIFICATION_TIME, user_id))
-        self.conn.commit()
+        with self._writer() as cursor:
+            # Delete user keywords
+            cursor.execute("DELETE FROM user_keywords WHERE user_id = ?", (user_id,))
+            # Delete user interactions
+            cursor.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,))
+            if keep_settings:
+                # Reset notification_time and min_salary_preference to defaults, keep notifications_enabled and prefs_json
+                cursor.execute("UPDATE users SET notification_time = ?, min_salary_preference = NULL, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?", (config.DEFAULT_NOTIFICATION_TIME, user_id))
+            else:
+                # Reset prefs_json to empty and clear notification settings
+                cursor.execute("UPDATE users SET prefs_json = ?, notifications_enabled = ?, notification_time = ?, min_salary_preference = NULL, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?", (json.dumps({}), 1 if config.DEFAULT_NOTIFICATIONS else 0, config.DEFAULT_NOTIFICATION_TIME, user_id))
+        self._invalidate_keyword_cache(user_id)
 
     def clear_all_negative_keywords(self):
         """Remove negative keywords for all users (migration aide)."""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM user_keywords WHERE is_negative = 1")
-        self.conn.commit()
+        with self._writer() as cursor:
+            cursor.execute("DELETE FROM user_keywords WHERE is_negative = 1")
+        self._invalidate_keyword_cache()
     
     def close(self):
         """Close database connection."""
+        if self._pool:
+            self._pool.close()
+            self._pool = None
         if self.conn:
             self.conn.close()
 
 
 # Global database instance
 _db = None
+_db_lock = threading.Lock()
 
 def get_db() -> Database:
-    """Get global database instance."""
+    """Get global database instance (created once, thread-safe)."""
     global _db
     if _db is None:
-        _db = Database()
+        with _db_lock:
+            if _db is None:
+                _db = Database()
     return _db
@@ -1,58 +1,197 @@
 """FindSGJobs API client for job search.
 """
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import json
-from typing import List, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 import config
 from database import get_db
 
+try:
+    import orjson
+except ImportError:  # optional speedup; fall back to the stdlib parser
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
-class FindSGJobsClient:
-    """Client for FindSGJobs API.
-    Provides a similar interface to the Adzuna client previously used.
+def _loads(payload):
+    """Decode JSON (response body bytes or a stored *_json string), using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _dumps(obj) -> str:
+    """Encode obj as a JSON string for the jobs table, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+# Upper-cased once so each fetched job costs a single set lookup
+_COMPANY_BLOCKLIST = frozenset(name.strip().upper() for name in config.COMPANY_BLOCKLIST if name)
+
+
+def _company_display_name_from_norm(job_item: Dict) -> str:
+    """Upper-cased company name of a normalized job, for blocklist matching."""
+    comp = job_item.get('company')
+    if isinstance(comp, dict):
+        return (comp.get('display_name') or '').strip().upper()
+    if isinstance(comp, str):
+        return comp.strip().upper()
+    return ''
+
+
+def job_list_field(job: Dict, name: str) -> tuple:
+    """Return a normalized job's list field (e.g. 'skills', 'category') as a tuple.
+
+    Jobs fresh from the API carry the parsed tuple under `name`; jobs loaded from the DB
+    only have the '<name>_json' column, which is decoded here.
     """
+    value = job.get(name)
+    if value is not None:
+        return value
+    raw = job.get(f'{name}_json')
+    # Most jobs leave some of these fields empty; skip the decoder for them
+    if not raw or raw == '[]':
+        return ()
+    try:
+        return tuple(_loads(raw))
+    except (TypeError, ValueError):
+        return ()
+
+
+class FindSGJobsClient:
+    """Client for FindSGJobs API (the bot's only job source)."""
 
     BASE_URL = config.FINDSGJOBS_API_ENDPOINT
     RATE_LIMIT_MAX = 60  # requests per minute
     RATE_LIMIT_WINDOW = 60  # seconds
     DEFAULT_PER_PAGE_COUNT = 100
+    MAX_RETRIES = 3
+    RETRY_BACKOFF_FACTOR = 0.5  # seconds; doubles on each retry
+    RETRY_BACKOFF_JITTER = 0.3  # seconds of random jitter added to each backoff
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    MIN_POOL_SIZE = 4  # pooled connections to the API host
+    # Constant part of the monthly SGD salary filter; only the amount varies per user
+    MONTHLY_SGD_SALARY_PARAMS = {
+        'id_Job_Currency': config.CURRENCIES.get('SGD'),
+        'id_Job_Interval': config.SALARY_INTERVALS.get('month'),
+    }
 
     def __init__(self):
         self.endpoint = config.FINDSGJOBS_API_ENDPOINT
         self.use_searchable = config.FINDSGJOBS_USE_SEARCHABLE
         self._redirect_url_validated = False
         self.db = get_db()
+        # Reuse one HTTP session so repeated searches share keep-alive connections
+        self.session = self._build_session()
+        # LRU cache of normalized results: params key -> (expires_at, jobs)
+        self._cache: "OrderedDict[Tuple, Tuple[float, List[Dict]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Event loop of the last run_blocking() caller, used for notices sent from worker threads
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Run a blocking search call (on this client, or code that uses it) in a worker thread.
+
+        HTTP requests and rate-limit sleeps then no longer stall the bot's event loop.
+        """
+        self._loop = asyncio.get_running_loop()
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    def _notify(self, coro):
+        """Schedule a bot coroutine on the event loop, whether called on it or from a worker thread."""
+        try:
+            asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            if self._loop is None or self._loop.is_closed():
+                coro.close()
+                return
+            asyncio.run_coroutine_threadsafe(coro, self._loop)
 
-    def _validate_redirect_url(self):
+    def _build_session(self) -> requests.Session:
+        """Create the HTTP session with retries (exponential backoff + jitter) on 429/5xx."""
+        retry_kwargs = dict(
+            total=self.MAX_RETRIES,
+            backoff_factor=self.RETRY_BACKOFF_FACTOR,
+            status_forcelist=self.RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        try:
+            retry = Retry(backoff_jitter=self.RETRY_BACKOFF_JITTER, **retry_kwargs)
+        except TypeError:
+            # urllib3 < 2 has no backoff_jitter; fall back to plain exponential backoff
+            retry = Retry(**retry_kwargs)
+        session = requests.Session()
+        # All requests go to one host; keep enough pooled keep-alive connections for concurrent
+        # digests and concurrently handled bot updates so none are opened and discarded per request
+        adapter = HTTPAdapter(
+            max_retries=retry,
+            pool_connections=1,
+            pool_maxsize=max(config.DIGEST_CONCURRENCY + config.BOT_CONCURRENT_UPDATES, self.MIN_POOL_SIZE),
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _validate_redirect_url(self, results: List[Dict]):
         """Check if the API endpoint returns a 'redirect_url' in job items.
-        This is done only once and cached for the session.
+        Piggybacks on the first search response instead of issuing a separate request,
+        and is done only once and cached for the session.
         """
-        if self._redirect_url_validated:
+        if self._redirect_url_validated or not results:
+            # Nothing to inspect yet; try again on the next non-empty response
             return
-        logger.info("[FINDSGJOBS] Validating whether redirect_url exists in API response")
-        # Use a larger per_page_count when validating to better observe fields like redirect_url
-        params = {"per_page_count": self.DEFAULT_PER_PAGE_COUNT, "page": 1}
-        try:
-            resp = requests.get(self.endpoint, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-            results = (data.get("data", {}).get("result") or [])
-            has_redirect = False
-            if results:
-                job = results[0].get('job', {})
-                if 'redirect_url' in job:
-                    has_redirect = True
-            self._redirect_url_validated = True
-            self._redirect_has_redirect_url = has_redirect
-            logger.info(f"[FINDSGJOBS] redirect_url present: {has_redirect}")
-        except Exception as e:
-            logger.warning(f"[FINDSGJOBS] redirect_url validation failed: {e}")
-            # Assume False, but cache check as done
-            self._redirect_url_validated = True
-            self._redirect_has_redirect_url = False
+        has_redirect = 'redirect_url' in results[0].get('job', {})
+        self._redirect_url_validated = True
+        self._redirect_has_redirect_url = has_redirect
+        logger.info("[FINDSGJOBS] redirect_url present: %s", has_redirect)
+
+    @staticmethod
+    def _cache_key(params: Dict) -> Tuple:
+        """Key for the response cache; keyword case and spacing don't change the API's results."""
+        if params.get('keywords'):
+            params = dict(params, keywords=' '.join(params['keywords'].lower().split()))
+        return tuple(sorted(params.items()))
+
+    def _cache_get(self, key: Tuple) -> Optional[List[Dict]]:
+        """Return copies of the cached jobs for key if present and not expired.
+
+        Callers add fields to the job dicts they get (e.g. while ranking), so each gets its own.
+        """
+        if config.FINDSGJOBS_CACHE_TTL_SECONDS <= 0:
+            return None
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, jobs = entry
+            if expires_at <= time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+        return [dict(job) for job in jobs]
+
+    def _cache_set(self, key: Tuple, jobs: List[Dict]):
+        """Store jobs for key, evicting the least recently used entries past the size limit."""
+        if config.FINDSGJOBS_CACHE_TTL_SECONDS <= 0:
+            return
+        with self._cache_lock:
+            # Copy so the caller's later edits to the returned dicts don't reach the cache
+            self._cache[key] = (time.monotonic() + config.FINDSGJOBS_CACHE_TTL_SECONDS, [dict(job) for job in jobs])
+            self._cache.move_to_end(key)
+            while len(self._cache) > config.FINDSGJOBS_CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
 
     def _construct_job_url(self, job: Dict) -> str:
         """Construct a job URL: prefer redirect_url if provided otherwise construct from id/sid."""
@@ -92,6 +231,8 @@ class FindSGJobsClient:
         salary_currency = (job.get('id_Job_Currency') or {}).get('caption') if isinstance(job.get('id_Job_Currency'), dict) else None
         salary_interval = (job.get('id_Job_Interval') or {}).get('caption') if isinstance(job.get('id_Job_Interval'), dict) else None
 
+        # List fields are kept both as tuples (used by formatting/scoring without re-parsing)
+        # and as JSON strings (stored in the jobs table)
         normalized = {
             'id': str(job.get('id') or job.get('sid') or ''),
             'title': job.get('Title'),
@@ -105,25 +246,37 @@ class FindSGJobsClient:
             'salary_interval': salary_interval,
             'salary_display_text': salary_display_text,
             'salary_hidden': job.get('id_Job_Donotdisplaysalary', 0),
-            'category_json': json.dumps(categories),
-            'employment_type_json': json.dumps(employment_types),
-            'mrt_stations_json': json.dumps(mrt_stations),
-            'skills_json': json.dumps(skills),
+            'category': tuple(categories),
+            'category_json': _dumps(categories),
+            'employment_type': tuple(employment_types),
+            'employment_type_json': _dumps(employment_types),
+            'mrt_stations': tuple(mrt_stations),
+            'mrt_stations_json': _dumps(mrt_stations),
+            'skills': tuple(skills),
+            'skills_json': _dumps(skills),
             'position_level': (job.get('id_Job_PositionLevel') or {}).get('caption') if job.get('id_Job_PositionLevel') else None,
             'experience_required': (job.get('MinimumYearsofExperience') or {}).get('caption') if job.get('MinimumYearsofExperience') else None,
             'education_required': (job.get('MinimumEducationLevel') or {}).get('caption') if job.get('MinimumEducationLevel') else None,
-            'timing_shift_json': json.dumps(timing_shifts),
+            'timing_shift': tuple(timing_shifts),
+            'timing_shift_json': _dumps(timing_shifts),
             'activation_date': job.get('activation_date'),
             'expiration_date': job.get('expiration_date'),
             'created': job.get('activation_date') or job.get('created'),
-            'raw_job': json.dumps(job)
         }
         return normalized
 
     def _make_request(self, params: Dict, context=None) -> List[Dict]:
         """Make a GET request to FindSGJobs with rate limiting and endpoint validation.
         If rate limited, `wait_for_rate_limit` returns wait time (seconds), which gets reported to user via provided context.
+        Identical requests within FINDSGJOBS_CACHE_TTL_SECONDS are served from memory without
+        consuming a rate limit slot.
         """
+        cache_key = self._cache_key(params)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.info("[FINDSGJOBS] Cache hit params=%s (%d jobs)", params, len(cached))
+            return cached
+
         # Rate limit
         wait_seconds = self.db.wait_for_rate_limit('findsgjobs', self.RATE_LIMIT_MAX, self.RATE_LIMIT_WINDOW)
         if wait_seconds:
@@ -136,22 +289,12 @@ class FindSGJobsClient:
                         chat_id = getattr(context, 'user_id', None)
                     if chat_id is not None:
                         try:
-                            import asyncio
-                            if asyncio.get_event_loop().is_running():
-                                # Schedule message sending without blocking
-                                asyncio.create_task(
-                                    context.bot.send_message(chat_id=chat_id, text=f"⚠️ Rate limit reached, waiting {int(wait_seconds)}s to continue..."))
-                            else:
-                                # Synchronous fallback (may not run in async contexts)
-                                context.bot.send_message(chat_id=chat_id, text=f"⚠️ Rate limit reached, waiting {int(wait_seconds)}s to continue...")
+                            # Schedule message sending without blocking
+                            self._notify(context.bot.send_message(
+                                chat_id=chat_id, text=f"⚠️ Rate limit reached, waiting {int(wait_seconds)}s to continue..."))
                         except Exception:
-                            # Last-resort approach: use non-awaited call
-                            try:
-                                context.bot.send_message(chat_id=chat_id, text=f"⚠️ Rate limit reached, waiting {int(wait_seconds)}s to continue...")
-                            except Exception:
-                                pass
+                            pass
                 # Sleep for the wait time, then re-check/consume a slot
-                import time
                 time.sleep(wait_seconds)
                 # After sleeping, try to register the new request (should succeed)
                 self.db.wait_for_rate_limit('findsgjobs', self.RATE_LIMIT_MAX, self.RATE_LIMIT_WINDOW)
@@ -159,16 +302,16 @@ class FindSGJobsClient:
                 # Silently continue if we couldn't notify or wait
                 pass
 
-        # Validate redirect_url only once per session
-        if not getattr(self, '_redirect_url_validated', False):
-            self._validate_redirect_url()
-
         try:
-            logger.info(f"[FINDSGJOBS] Requesting jobs from {self.endpoint} params={params}")
-            resp = requests.get(self.endpoint, params=params, timeout=10)
+            logger.info("[FINDSGJOBS] Requesting jobs from %s params=%s", self.endpoint, params)
+            resp = self.session.get(self.endpoint, params=params, timeout=10)
             resp.raise_for_status()
-            data = resp.json()
+            # Body is transparently decompressed (gzip/deflate, plus br when Brotli is installed)
+            data = _loads(resp.content)
             results = data.get('data', {}).get('result', [])
+            # Validate redirect_url only once per session, using this response
+            if not self._redirect_url_validated:
+                self._validate_redirect_url(results)
             # If we previously checked and endpoint was supposed to have redirect_url but missing -> log
             if getattr(self, '_redirect_has_redirect_url', False):
                 # check and warn if missing in this response
@@ -177,29 +320,22 @@ class FindSGJobsClient:
             # Normalize jobs
             normalized_jobs = [self._normalize_job(item) for item in results]
             # Filter out blocklisted companies (case-insensitive) defined in config.COMPANY_BLOCKLIST
-            try:
-                blocklist = {b.strip().upper() for b in getattr(config, 'COMPANY_BLOCKLIST', []) if b}
-            except Exception:
-                blocklist = set()
-
-            def _company_display_name_from_norm(job_item: Dict) -> str:
-                comp = job_item.get('company')
-                if isinstance(comp, dict):
-                    return (comp.get('display_name') or '').strip().upper()
-                if isinstance(comp, str):
-                    return comp.strip().upper()
-                return ''
-
-            if blocklist:
+            if _COMPANY_BLOCKLIST:
                 before = len(normalized_jobs)
-                normalized_jobs = [j for j in normalized_jobs if _company_display_name_from_norm(j) not in blocklist]
+                normalized_jobs = [j for j in normalized_jobs if _company_display_name_from_norm(j) not in _COMPANY_BLOCKLIST]
                 after = len(normalized_jobs)
                 if before != after:
-                    logger.info(f"[FINDSGJOBS] Filtered out {before-after} jobs due to company blocklist")
+                    logger.info("[FINDSGJOBS] Filtered out %d jobs due to company blocklist", before-after)
 
+            # Empty results are not cached so the next attempt asks the API again
+            if normalized_jobs:
+                self._cache_set(cache_key, normalized_jobs)
             return normalized_jobs
         except requests.exceptions.RequestException as e:
-            logger.error(f"[FINDSGJOBS] Error fetching jobs: {e}")
+            logger.error("[FINDSGJOBS] Error fetching jobs: %s", e)
+            return []
+        except ValueError as e:
+            logger.error("[FINDSGJOBS] Invalid JSON in response: %s", e)
             return []
 
     def search_jobs(self, keywords: str = '', min_salary: Optional[int] = None, page: int = 1, per_page_count: int = DEFAULT_PER_PAGE_COUNT, sort_field: str = 'activation_date', sort_direction: str = 'desc', context=None) -> List[Dict]:
@@ -214,46 +350,42 @@ class FindSGJobsClient:
         # Only apply monthly min salary filter per requirements
         if min_salary is not None:
             params['id_Job_Salary'] = min_salary
-            params['id_Job_Currency'] = config.CURRENCIES.get('SGD')
-            params['id_Job_Interval'] = config.SALARY_INTERVALS.get('month')
+            params.update(self.MONTHLY_SGD_SALARY_PARAMS)
 
         return self._make_request(params, context=context)
 
-    def search_by_keywords(self, keywords: List[str], limit: int = 50, user_id: int = None, context=None) -> List[Dict]:
-        kw = ' '.join(keywords) if isinstance(keywords, list) else keywords
+    def _user_search_params(self, limit: Optional[int], user_id: Optional[int]) -> Tuple[Optional[int], int]:
+        """Return (min_salary, per_page_count) for a user-scoped search."""
         min_salary = None
         if user_id:
-            user = self.db.get_user(user_id)
-            min_salary = user.get('min_salary_preference') if user else None
-        # Ensure we request a meaningful page size (at least DEFAULT_PER_PAGE_COUNT) to fetch more candidates
+            min_salary = self.db.get_user_min_salary(user_id)
         # Request more candidates (double the requested limit) to account for any filtered/blocklisted jobs
         per_page = max(limit * 2, self.DEFAULT_PER_PAGE_COUNT) if (limit is not None) else self.DEFAULT_PER_PAGE_COUNT
+        return min_salary, per_page
+
+    def search_by_keywords(self, keywords: List[str], limit: int = 50, user_id: int = None, context=None) -> List[Dict]:
+        kw = ' '.join(keywords) if isinstance(keywords, list) else keywords
+        min_salary, per_page = self._user_search_params(limit, user_id)
         return self.search_jobs(keywords=kw, min_salary=min_salary, per_page_count=per_page, context=context)
 
     def get_recent_jobs(self, limit: int = 100, user_id: int = None, context=None) -> List[Dict]:
-        min_salary = None
-        if user_id:
-            user = self.db.get_user(user_id)
-            min_salary = user.get('min_salary_preference') if user else None
-        # Request more candidates (double the requested limit) to account for any filtered/blocklisted jobs
-        per_page = max(limit * 2, self.DEFAULT_PER_PAGE_COUNT) if (limit is not None) else self.DEFAULT_PER_PAGE_COUNT
+        min_salary, per_page = self._user_search_params(limit, user_id)
         return self.search_jobs(keywords='', min_salary=min_salary, per_page_count=per_page, context=context)
 
     def search_custom(self, query: str, limit: int = 100, user_id: int = None, context=None) -> List[Dict]:
-        min_salary = None
-        if user_id:
-            user = self.db.get_user(user_id)
-            min_salary = user.get('min_salary_preference') if user else None
-        # Request more candidates (double the requested limit) to account for any filtered/blocklisted jobs
-        per_page = max(limit * 2, self.DEFAULT_PER_PAGE_COUNT) if (limit is not None) else self.DEFAULT_PER_PAGE_COUNT
+        min_salary, per_page = self._user_search_params(limit, user_id)
         return self.search_jobs(keywords=query, min_salary=min_salary, per_page_count=per_page, context=context)
 
 
 # Global singleton
 _client = None
+_client_lock = threading.Lock()
 
 def get_findsgjobs_client() -> FindSGJobsClient:
+    """Get global FindSGJobs client instance (created once, thread-safe)."""
     global _client
     if _client is None:
-        _client = FindSGJobsClient()
+        with _client_lock:
+            if _client is None:
+                _client = FindSGJobsClient()
     return _client
@@ -1,17 +1,21 @@
 """Keyword management and job scoring logic."""
 import re
-import json
+import threading
 import logging
 from typing import List, Dict, Tuple
 from collections import Counter
 import config
 import random
 from database import get_db
+from findsgjobs_client import job_list_field
 from llm_service import get_llm_service
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Tokens are word-character runs of 3+ characters; compiled once since every job's text is tokenized
+_TOKEN_RE = re.compile(r'\w{3,}')
+
 
 class KeywordManager:
     """Manages user keywords and scores jobs."""
@@ -25,11 +29,8 @@ class KeywordManager:
         """Tokenize text into lowercase words."""
         if not text:
             return []
-        # Remove special characters and split
-        text = re.sub(r'[^\w\s]', ' ', text.lower())
-        tokens = text.split()
-        # Filter out very short tokens
-        return [t for t in tokens if len(t) > 2]
+        # Runs of word characters, skipping very short tokens (special characters split words)
+        return _TOKEN_RE.findall(text.lower())
     
     def score_job(self, job: Dict, user_keywords: List[Dict]) -> Tuple[float, List[str]]:
         """
@@ -52,30 +53,18 @@ class KeywordManager:
             if isinstance(job.get('company'), dict) 
             else str(job.get('company', ''))
         )
-        # Parse skills, categories, MRT stations if available and add tokens
-        skills = []
-        try:
-            skills = json.loads(job.get('skills_json') or '[]')
-        except Exception:
-            skills = []
+        # Skills, categories, MRT stations (already parsed at ingest) add tokens
+        skills = job_list_field(job, 'skills')
         skill_tokens = []
         for s in skills:
             skill_tokens.extend(self.tokenize(s))
 
-        categories = []
-        try:
-            categories = json.loads(job.get('category_json') or '[]')
-        except Exception:
-            categories = []
+        categories = job_list_field(job, 'category')
         cat_tokens = []
         for c in categories:
             cat_tokens.extend(self.tokenize(c))
 
-        mrt = []
-        try:
-            mrt = json.loads(job.get('mrt_stations_json') or '[]')
-        except Exception:
-            mrt = []
+        mrt = job_list_field(job, 'mrt_stations')
         mrt_tokens = []
         for m in mrt:
             mrt_tokens.extend(self.tokenize(m))
@@ -88,6 +77,8 @@ class KeywordManager:
         score = 0.0
         matched_keywords = []
         negative_match = False
+        # Read once; the loop below runs for every keyword of every ranked job
+        hard_negative_at = config.NEGATIVE_PROMOTE_AT
         
         for kw_data in user_keywords:
             keyword = kw_data['keyword'].lower()
@@ -99,26 +90,26 @@ class KeywordManager:
                 matched_keywords.append(keyword)
                 
                 # Hard negative filter - immediately reject
-                if is_negative and weight < config.NEGATIVE_PROMOTE_AT:
-                    logger.debug(f"[SCORE] Job {job_id} hard rejected due to negative keyword '{keyword}' (weight: {weight})")
+                if is_negative and weight < hard_negative_at:
+                    logger.debug("[SCORE] Job %s hard rejected due to negative keyword '%s' (weight: %s)", job_id, keyword, weight)
                     return -1000.0, [keyword]
                 
                 # Soft negative - subtract weight
                 if is_negative:
                     score -= abs(weight)
                     negative_match = True
-                    logger.debug(f"[SCORE] Job {job_id} soft negative '{keyword}' (weight: {weight}, new score: {score})")
+                    logger.debug("[SCORE] Job %s soft negative '%s' (weight: %s, new score: %s)", job_id, keyword, weight, score)
                 else:
                     # Positive match - add weight
                     # Cap contribution to avoid single keyword dominance
                     contribution = min(weight, 5.0)
                     score += contribution
-                    logger.debug(f"[SCORE] Job {job_id} positive match '{keyword}' (weight: {weight}, contribution: {contribution}, new score: {score})")
+                    logger.debug("[SCORE] Job %s positive match '%s' (weight: %s, contribution: %s, new score: %s)", job_id, keyword, weight, contribution, score)
         
         # Penalty if only negative matches
         if negative_match and score <= 0:
             score -= 5.0
-            logger.debug(f"[SCORE] Job {job_id} additional penalty for only negative matches (score: {score})")
+            logger.debug("[SCORE] Job %s additional penalty for only negative matches (score: %s)", job_id, score)
         
         # Small boost for title matches (title is more important)
         title_match_bonus = sum(
@@ -127,7 +118,7 @@ class KeywordManager:
         )
         if title_match_bonus > 0:
             score += title_match_bonus
-            logger.debug(f"[SCORE] Job {job_id} title match bonus: {title_match_bonus} (final score: {score})")
+            logger.debug("[SCORE] Job %s title match bonus: %s (final score: %s)", job_id, title_match_bonus, score)
 
         # Skill exact match bonus (higher weight for explicit skills)
         skills_lower = [s.lower() for s in skills]
@@ -136,7 +127,7 @@ class KeywordManager:
             if not kw_data['is_negative'] and kw in skills_lower and kw not in matched_keywords:
                 score += 0.8
                 matched_keywords.append(kw)
-                logger.debug(f"[SCORE] Job {job_id} skills exact bonus for '{kw}' (+0.8) -> {score}")
+                logger.debug("[SCORE] Job %s skills exact bonus for '%s' (+0.8) -> %s", job_id, kw, score)
 
         # Category match bonus
         categories_lower = [c.lower() for c in categories]
@@ -145,14 +136,30 @@ class KeywordManager:
             if not kw_data['is_negative'] and kw in categories_lower and kw not in matched_keywords:
                 score += 0.6
                 matched_keywords.append(kw)
-                logger.debug(f"[SCORE] Job {job_id} category bonus for '{kw}' (+0.6) -> {score}")
+                logger.debug("[SCORE] Job %s category bonus for '%s' (+0.6) -> %s", job_id, kw, score)
         
         final_score = max(score, 0.0)
-        logger.debug(f"[SCORE] Job {job_id} final score: {final_score}, matched: {matched_keywords}")
+        logger.debug("[SCORE] Job %s final score: %s, matched: %s", job_id, final_score, matched_keywords)
         
         return final_score, matched_keywords
 
     # (search_with_keyword_retry implementation moved lower to keep randomized behavior)
+
+    @staticmethod
+    def _dedupe_jobs(jobs: List[Dict]) -> List[Dict]:
+        """Drop jobs whose id was already seen, preserving order. Jobs without an id are kept."""
+        seen_ids = set()
+        unique_jobs = []
+        for job in jobs:
+            job_id = job.get('id')
+            if job_id:
+                if job_id in seen_ids:
+                    continue
+                seen_ids.add(job_id)
+            unique_jobs.append(job)
+        if len(unique_jobs) != len(jobs):
+            logger.info("[RANK] Dropped %d duplicate jobs", len(jobs) - len(unique_jobs))
+        return unique_jobs
     
     def rank_jobs(self, jobs: List[Dict], user_id: int, 
                  exclude_recent: bool = True) -> List[Tuple[Dict, float, List[str]]]:
@@ -167,24 +174,29 @@ class KeywordManager:
         Returns:
             List of (job, score, matched_keywords) tuples, sorted by score
         """
-        logger.info(f"[RANK] Starting to rank {len(jobs)} jobs for user {user_id}")
+        logger.info("[RANK] Starting to rank %d jobs for user %s", len(jobs), user_id)
+        
+        # The API can return the same posting more than once; keep only the first occurrence
+        jobs = self._dedupe_jobs(jobs)
         
         # Get user keywords
         user_keywords = self.db.get_user_keywords(user_id)
-        logger.info(f"[RANK] User {user_id} has {len(user_keywords)} keywords")
+        logger.info("[RANK] User %s has %d keywords", user_id, len(user_keywords))
         
         if not user_keywords:
             # No keywords yet - return jobs with neutral scoring
-            logger.info(f"[RANK] No keywords for user {user_id}, returning all jobs with neutral score")
+            logger.info("[RANK] No keywords for user %s, returning all jobs with neutral score", user_id)
             return [(job, 1.0, []) for job in jobs]
         
         # Get recently shown jobs if needed
         recent_job_ids = set()
         if exclude_recent:
-            recent_job_ids = set(self.db.get_recently_shown_jobs(user_id, days=config.EXCLUDE_RECENT_DAYS))
-            logger.info(f"[RANK] User {user_id} has {len(recent_job_ids)} recently shown jobs (last {config.EXCLUDE_RECENT_DAYS} days)")
+            recent_job_ids = set(self.db.get_recently_shown_jobs(
+                user_id, days=config.EXCLUDE_RECENT_DAYS, job_ids=[job.get('id') for job in jobs if job.get('id')]
+            ))
+            logger.info("[RANK] %d of these jobs were shown to user %s recently (last %s days)", len(recent_job_ids), user_id, config.EXCLUDE_RECENT_DAYS)
             if recent_job_ids:
-                logger.debug(f"[RANK] Recent job IDs: {list(recent_job_ids)[:5]}... (showing first 5)")
+                logger.debug("[RANK] Recent job IDs: %s... (showing first 5)", list(recent_job_ids)[:5])
         
         # Score and filter jobs
         scored_jobs = []
@@ -198,7 +210,7 @@ class KeywordManager:
             # Skip recently shown jobs
             if job_id in recent_job_ids:
                 excluded_count += 1
-                logger.debug(f"[RANK] Excluding recently shown job: {job_id} - {job_title}")
+                logger.debug("[RANK] Excluding recently shown job: %s - %s", job_id, job_title)
                 continue
             
             score, matched = self.score_job(job, user_keywords)
@@ -206,20 +218,20 @@ class KeywordManager:
             # Skip jobs with negative scores (hard negatives)
             if score < 0:
                 negative_score_count += 1
-                logger.debug(f"[RANK] Excluding job with negative score: {job_id} - {job_title} (score: {score:.2f}, matched: {matched})")
+                logger.debug("[RANK] Excluding job with negative score: %s - %s (score: %.2f, matched: %s)", job_id, job_title, score, matched)
                 continue
             
-            logger.debug(f"[RANK] Job {job_id} - {job_title} scored {score:.2f} (matched: {matched})")
+            logger.debug("[RANK] Job %s - %s scored %.2f (matched: %s)", job_id, job_title, score, matched)
             scored_jobs.append((job, score, matched))
         
-        logger.info(f"[RANK] Results for user {user_id}: {len(scored_jobs)} jobs passed, "
-                   f"{excluded_count} excluded (recent), {negative_score_count} excluded (negative score)")
+        logger.info("[RANK] Results for user %s: %d jobs passed, %d excluded (recent), %d excluded (negative score)",
+                    user_id, len(scored_jobs), excluded_count, negative_score_count)
         
         # Sort by score descending
         scored_jobs.sort(key=lambda x: x[1], reverse=True)
         
         if scored_jobs:
-            logger.info(f"[RANK] Top 5 scores: {[(job.get('id'), score) for job, score, _ in scored_jobs[:5]]}")
+            logger.info("[RANK] Top 5 scores: %s", [(job.get('id'), score) for job, score, _ in scored_jobs[:5]])
         
         return scored_jobs
 
@@ -259,11 +271,11 @@ class KeywordManager:
             # Find the source of the keyword (manual/auto)
             kw_row = next((k for k in positive_keywords if k.get('keyword') == keyword_text), {})
             source = kw_row.get('source') or 'auto'
-            logger.info(f"[KMR] Attempt {attempts}/{max_attempts} for user {user_id} using keyword: {keyword_text} (source={source})")
+            logger.info("[KMR] Attempt %d/%d for user %s using keyword: %s (source=%s)", attempts, max_attempts, user_id, keyword_text, source)
             try:
                 jobs = findsg_client.search_by_keywords([keyword_text], limit=limit, user_id=user_id, context=context)
             except Exception as e:
-                logger.warning(f"[KMR] Search failed for keyword '{keyword_text}': {e}")
+                logger.warning("[KMR] Search failed for keyword '%s': %s", keyword_text, e)
                 jobs = []
 
             if jobs:
@@ -274,25 +286,28 @@ class KeywordManager:
                 try:
                     self.db.delete_keyword(user_id, keyword_text)
                     deleted_keywords.append(keyword_text)
-                    logger.info(f"[KMR] Deleted auto keyword '{keyword_text}' for user {user_id} after zero-result search")
+                    logger.info("[KMR] Deleted auto keyword '%s' for user %s after zero-result search", keyword_text, user_id)
                 except Exception as e:
-                    logger.exception(f"[KMR] Failed to delete keyword '{keyword_text}' for user {user_id}: {e}")
+                    logger.exception("[KMR] Failed to delete keyword '%s' for user %s: %s", keyword_text, user_id, e)
             else:
                 manual_failed.append(keyword_text)
 
         # Fallback to recent jobs
-        logger.info(f"[KMR] All {attempts} attempts for user {user_id} returned no results. Falling back to recent jobs.")
+        logger.info("[KMR] All %d attempts for user %s returned no results. Falling back to recent jobs.", attempts, user_id)
         jobs = findsg_client.get_recent_jobs(limit=limit, user_id=user_id, context=context)
         return jobs, None, deleted_keywords, manual_failed, True
     
-    def update_keywords_from_feedback(self, user_id: int, job: Dict, action: str):
+    def update_keywords_from_feedback(self, user_id: int, job: Dict, action: str, interaction_job_id: str = None):
         """
         Update user keywords based on job feedback.
         
+        All keyword writes are committed together once the LLM suggestions are in.
+        
         Args:
             user_id: User ID
             job: Job dictionary
             action: 'like' or 'dislike'
+            interaction_job_id: If given, the interaction is logged in the same commit
         """
         # Get current keywords
         current_keywords = self.db.get_user_keywords(user_id)
@@ -313,6 +328,8 @@ class KeywordManager:
         job_tokens.update(self.tokenize(full_description))
         job_text_block = f"{job_title} {company} {full_description}".lower()
         
+        # Direct weight changes are applied to the local copy now and written with the rest below
+        weight_updates = []
         if action in ('like', 'dislike') and job_tokens:
             direct_delta = config.LIKE_BOOST if action == 'like' else config.DISLIKE_PENALTY
             if direct_delta != 0:
@@ -329,9 +346,9 @@ class KeywordManager:
                 for kw in matched_existing:
                     # Do not update weight for manual keywords - they have fixed weight
                     if kw.get('source') == 'manual':
-                        logger.debug(f"Skipping weight update for manual keyword: {kw['keyword']}")
+                        logger.debug("Skipping weight update for manual keyword: %s", kw['keyword'])
                         continue
-                    self.db.update_keyword_weight(user_id, kw['keyword'], direct_delta)
+                    weight_updates.append((kw['keyword'], direct_delta))
                     kw['weight'] += direct_delta
                     kw['is_negative'] = kw['weight'] < config.NEGATIVE_PROMOTE_AT
         
@@ -339,10 +356,7 @@ class KeywordManager:
         
         # Get LLM keyword suggestions
         # Extract skills array to provide context to the LLM
-        try:
-            skills = json.loads(job.get('skills_json') or '[]')
-        except Exception:
-            skills = []
+        skills = list(job_list_field(job, 'skills'))
         llm_suggestions = self.llm.expand_keywords(
             job_title=job_title,
             company=str(company),
@@ -360,101 +374,107 @@ class KeywordManager:
         else:
             base_delta = 0.0
         
-        # Process LLM suggestions
-        for suggestion in llm_suggestions:
-            keyword = suggestion['keyword']
-            sentiment = suggestion['sentiment']
-            rationale = suggestion.get('rationale', '')
+        with self.db.transaction():
+            if interaction_job_id:
+                self.db.log_interaction(user_id, interaction_job_id, action)
+            for keyword, delta in weight_updates:
+                self.db.update_keyword_weight(user_id, keyword, delta)
             
-            # Find if keyword exists
-            existing = next((kw for kw in current_keywords if kw['keyword'] == keyword), None)
+            # Process LLM suggestions
+            for suggestion in llm_suggestions:
+                keyword = suggestion['keyword']
+                sentiment = suggestion['sentiment']
+                rationale = suggestion.get('rationale', '')
             
-            if existing:
-                # Update existing keyword
-                # Adjust based on sentiment alignment
-                if action == 'like' and sentiment == 'positive':
-                    delta = base_delta
-                elif action == 'dislike' and sentiment == 'negative':
-                    delta = base_delta if base_delta <= 0 else -abs(base_delta)
-                elif action == 'like' and sentiment == 'negative':
-                    delta = -abs(base_delta) * 0.5  # Conflicting signal
-                elif action == 'dislike' and sentiment == 'positive':
-                    delta = base_delta * 0.5  # Conflicting signal
-                else:
-                    delta = 0.0
+                # Find if keyword exists
+                existing = next((kw for kw in current_keywords if kw['keyword'] == keyword), None)
+            
+                if existing:
+                    # Update existing keyword
+                    # Adjust based on sentiment alignment
+                    if action == 'like' and sentiment == 'positive':
+                        delta = base_delta
+                    elif action == 'dislike' and sentiment == 'negative':
+                        delta = base_delta if base_delta <= 0 else -abs(base_delta)
+                    elif action == 'like' and sentiment == 'negative':
+                        delta = -abs(base_delta) * 0.5  # Conflicting signal
+                    elif action == 'dislike' and sentiment == 'positive':
+                        delta = base_delta * 0.5  # Conflicting signal
+                    else:
+                        delta = 0.0
                 
-                new_weight = existing['weight'] + delta
-                is_negative = new_weight < config.NEGATIVE_PROMOTE_AT
+                    new_weight = existing['weight'] + delta
+                    is_negative = new_weight < config.NEGATIVE_PROMOTE_AT
                 
-                # If existing keyword is manual, do not overwrite or change weight from LLM suggestions
-                if existing.get('source') == 'manual':
-                    logger.debug("Skipping LLM overwrite for manual keyword: %s", keyword)
-                else:
-                    self.db.upsert_keyword(
-                        user_id=user_id,
-                        keyword=keyword,
-                        weight=new_weight,
-                        is_negative=is_negative,
-                        rationale=rationale,
-                        source='auto'
-                    )
+                    # If existing keyword is manual, do not overwrite or change weight from LLM suggestions
+                    if existing.get('source') == 'manual':
+                        logger.debug("Skipping LLM overwrite for manual keyword: %s", keyword)
+                    else:
+                        self.db.upsert_keyword(
+                            user_id=user_id,
+                            keyword=keyword,
+                            weight=new_weight,
+                            is_negative=is_negative,
+                            rationale=rationale,
+                            source='auto'
+                        )
                 
-                # Keep local copy in sync for subsequent iterations
-                existing['weight'] = new_weight
-                existing['is_negative'] = is_negative
-            else:
-                # New keyword - seed with appropriate weight
-                if action == 'like' and sentiment == 'positive':
-                    initial_weight = 1.0
-                    is_negative = False
-                elif action == 'dislike' and sentiment == 'negative':
-                    initial_weight = -1.0
-                    is_negative = True
+                    # Keep local copy in sync for subsequent iterations
+                    existing['weight'] = new_weight
+                    existing['is_negative'] = is_negative
                 else:
-                    initial_weight = 0.5 if sentiment == 'positive' else -0.5
-                    is_negative = sentiment == 'negative'
+                    # New keyword - seed with appropriate weight
+                    if action == 'like' and sentiment == 'positive':
+                        initial_weight = 1.0
+                        is_negative = False
+                    elif action == 'dislike' and sentiment == 'negative':
+                        initial_weight = -1.0
+                        is_negative = True
+                    else:
+                        initial_weight = 0.5 if sentiment == 'positive' else -0.5
+                        is_negative = sentiment == 'negative'
                 
-                if not is_negative:
-                    if positive_count >= config.TOP_K:
-                        if new_positive_added >= config.MAX_NEW_POSITIVE_PER_FEEDBACK:
+                    if not is_negative:
+                        if positive_count >= config.TOP_K:
+                            if new_positive_added >= config.MAX_NEW_POSITIVE_PER_FEEDBACK:
+                                logger.debug(
+                                    "Skipping new keyword '%s' for user %s (limit reached)",
+                                    keyword,
+                                    user_id
+                                )
+                                continue
+                            new_positive_added += 1
+                        positive_count += 1
+                    else:
+                        if new_negative_added >= config.MAX_NEW_NEGATIVE_PER_FEEDBACK:
                             logger.debug(
-                                "Skipping new keyword '%s' for user %s (limit reached)",
+                                "Skipping new negative keyword '%s' for user %s (limit reached)",
                                 keyword,
                                 user_id
                             )
                             continue
-                        new_positive_added += 1
-                    positive_count += 1
-                else:
-                    if new_negative_added >= config.MAX_NEW_NEGATIVE_PER_FEEDBACK:
-                        logger.debug(
-                            "Skipping new negative keyword '%s' for user %s (limit reached)",
-                            keyword,
-                            user_id
-                        )
-                        continue
-                    new_negative_added += 1
+                        new_negative_added += 1
                 
-                self.db.upsert_keyword(
-                    user_id=user_id,
-                    keyword=keyword,
-                    weight=initial_weight,
-                    is_negative=is_negative,
-                    rationale=rationale,
-                    source='auto'
-                )
-                current_keywords.append({
-                    'keyword': keyword,
-                    'weight': initial_weight,
-                    'is_negative': is_negative,
-                    'source': 'auto'
-                })
-        
-        # Apply decay to all keywords
-        self.db.decay_keywords(user_id, config.DECAY)
-        
-        # Prune low-weight keywords (keep top K positive + all active negatives)
-        self._prune_keywords(user_id)
+                    self.db.upsert_keyword(
+                        user_id=user_id,
+                        keyword=keyword,
+                        weight=initial_weight,
+                        is_negative=is_negative,
+                        rationale=rationale,
+                        source='auto'
+                    )
+                    current_keywords.append({
+                        'keyword': keyword,
+                        'weight': initial_weight,
+                        'is_negative': is_negative,
+                        'source': 'auto'
+                    })
+        
+            # Apply decay to all keywords
+            self.db.decay_keywords(user_id, config.DECAY)
+        
+            # Prune low-weight keywords (keep top K positive + all active negatives)
+            self._prune_keywords(user_id)
     
     def _prune_keywords(self, user_id: int):
         """Keep only top K keywords plus active negatives."""
@@ -536,10 +556,13 @@ class KeywordManager:
 
 # Global manager instance
 _manager = None
+_manager_lock = threading.Lock()
 
 def get_keyword_manager() -> KeywordManager:
-    """Get global keyword manager instance."""
+    """Get global keyword manager instance (created once, thread-safe)."""
     global _manager
     if _manager is None:
-        _manager = KeywordManager()
+        with _manager_lock:
+            if _manager is None:
+                _manager = KeywordManager()
     return _manager
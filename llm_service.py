@@ -1,9 +1,9 @@
 """LLM service for keyword expansion using OpenAI."""
 import json
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
 from openai import OpenAI
-from pytz import timezone
 import config
 
 
@@ -185,16 +185,19 @@ Focus on concrete, searchable terms. Avoid overly generic words."""
             ]
             # Log a lightweight message and return a deterministic daily fallback
             print(f"LLM encouragement generation failed: {e}")
-            today = datetime.now(timezone(config.DEFAULT_TIMEZONE)).date().toordinal()
+            today = datetime.now(config.TZ).date().toordinal()
             return fallbacks[today % len(fallbacks)]
 
 
 # Global service instance
 _service = None
+_service_lock = threading.Lock()
 
 def get_llm_service() -> LLMKeywordService:
-    """Get global LLM service instance."""
+    """Get global LLM service instance (created once, thread-safe)."""
     global _service
     if _service is None:
-        _service = LLMKeywordService()
+        with _service_lock:
+            if _service is None:
+                _service = LLMKeywordService()
     return _service
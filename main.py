@@ -1,24 +1,36 @@
 """Main entry point for the Telegram Job Bot."""
 import asyncio
+import atexit
 import os
+import queue
 import sys
 import platform
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from telegram import Update
 from telegram.ext import Application
 from bot import get_bot
 from scheduler import run_digest, start_background_scheduler, shutdown_scheduler
 import config
 
-# Configure logging
+# Configure logging: records are formatted by the calling thread and put on a queue; a
+# background listener does the console/file I/O so handlers never block on writes.
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(
+    _log_queue,
+    logging.StreamHandler(sys.stdout),
+    logging.FileHandler('bot.log', encoding='utf-8'),
+    respect_handler_level=True,
+)
+# force=True: importing bot.py already ran basicConfig, which would make this call a no-op
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log', encoding='utf-8')
-    ]
+    handlers=[QueueHandler(_log_queue)],
+    force=True
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 
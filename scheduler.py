@@ -2,12 +2,13 @@
 import asyncio
 import logging
 from datetime import datetime
-from pytz import timezone
 import random
+import threading
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 from typing import List, Dict
 from telegram import Bot
+from telegram.ext import AIORateLimiter, ExtBot
 from telegram.constants import ParseMode
 import config
 from database import get_db
@@ -51,6 +52,26 @@ class DigestScheduler:
         self.findsgjobs = get_findsgjobs_client()
         self.keyword_manager = get_keyword_manager()
         self.job_bot = get_bot()
+        # The running application's bot when started from it (one rate limiter for digests and
+        # replies; the application initializes and shuts it down), else None: each run opens its own
+        self._telegram_bot = None
+
+    def use_bot(self, bot: Bot):
+        """Send digests through `bot` (e.g. application.bot) instead of a separate instance."""
+        self._telegram_bot = bot
+
+    @staticmethod
+    def _create_telegram_bot() -> Bot:
+        """Create a bot for a standalone digest run, rate-limited when the extra is installed.
+
+        Use it as `async with bot:` so its HTTP client and rate limiter are initialized and shut down.
+        """
+        try:
+            # Queues digest fan-out within Telegram's flood limits and retries on RetryAfter
+            return ExtBot(token=config.TELEGRAM_BOT_TOKEN, rate_limiter=AIORateLimiter(max_retries=3))
+        except RuntimeError:
+            logger.warning("AIORateLimiter unavailable (install python-telegram-bot[rate-limiter]); sending digests without it")
+            return Bot(token=config.TELEGRAM_BOT_TOKEN)
 
     async def send_digest_to_user(self, bot: Bot, user: Dict):
         """Send daily digest to a single user."""
@@ -63,20 +84,15 @@ class DigestScheduler:
         
         try:
             # Get user keywords
-            keywords = self.db.get_user_keywords(user_id, top_k=config.TOP_K)
+            keywords = await asyncio.to_thread(self.db.get_user_keywords, user_id, top_k=config.TOP_K)
             keyword_list = [kw['keyword'] for kw in keywords if not kw['is_negative']]
 
-            # Randomly select 1 keyword for search (if available)
-            if len(keyword_list) >= 1:
-                selected_keywords = random.sample(keyword_list, 1)
-            else:
-                selected_keywords = []
-
-            # Log / print keywords used for this user's digest (helpful for debugging)
-            logger.info(f"[DIGEST] User {user_id} has {len(keyword_list)} positive keywords")
-            logger.info(f"[DIGEST] User {user_id} selected keyword for search: {selected_keywords}")
-            print(f"[DIGEST] User {user_id} has {len(keyword_list)} positive keywords: {keyword_list}")
-            print(f"[DIGEST] User {user_id} selected keyword for search: {selected_keywords}")
+            # Randomly select 1 keyword to try first (if available); the same pick is used for the search
+            preferred_keyword = random.choice(keyword_list) if keyword_list else None
+
+            # Log keywords used for this user's digest (helpful for debugging)
+            logger.info("[DIGEST] User %s has %d positive keywords: %s", user_id, len(keyword_list), keyword_list)
+            logger.info("[DIGEST] User %s selected keyword for search: %s", user_id, preferred_keyword)
             
             # Create a lightweight context to enable rate-limit messages
             class _Ctx:
@@ -87,19 +103,19 @@ class DigestScheduler:
 
             ctx = _Ctx(bot, user_id)
             # Fetch jobs using retry logic; for scheduled digests we will perform silent cleanup (log deleted keywords)
-            preferred_keyword = random.choice(keyword_list) if keyword_list else None
-            jobs, used_keyword, deleted_keywords, manual_failed, used_recent = self.keyword_manager.search_with_keyword_retry(
+            jobs, used_keyword, deleted_keywords, manual_failed, used_recent = await self.findsgjobs.run_blocking(
+                self.keyword_manager.search_with_keyword_retry,
                 user_id=user_id, findsg_client=self.findsgjobs, context=ctx, limit=50, preferred_keyword=preferred_keyword
             )
             if deleted_keywords:
-                logger.info(f"[DIGEST] Deleted auto keywords for user {user_id} during digest retry: {deleted_keywords}")
+                logger.info("[DIGEST] Deleted auto keywords for user %s during digest retry: %s", user_id, deleted_keywords)
             
             if not jobs:
                 # No jobs found - skip for now
                 return
             
-            # Rank jobs
-            ranked = self.keyword_manager.rank_jobs(jobs, user_id, exclude_recent=True)
+            # Rank jobs in a worker thread so concurrent digests and bot updates aren't stalled
+            ranked = await asyncio.to_thread(self.keyword_manager.rank_jobs, jobs, user_id, exclude_recent=True)
             
             if not ranked:
                 # No new jobs
@@ -111,7 +127,7 @@ class DigestScheduler:
                 # Compute lucky number using ASCII sum + (user_id * day_of_month) then mod 10000
                 try:
                     # compute with timezone-aware day of month
-                    day_of_month = datetime.now(timezone(config.DEFAULT_TIMEZONE)).day
+                    day_of_month = datetime.now(config.TZ).day
                     lucky_number = _calculate_lucky_number(encouragement, user_id, day_of_month)
                     lucky_emoji = _pick_lucky_emoji()
                 except Exception:
@@ -131,23 +147,17 @@ class DigestScheduler:
             
             # Send top jobs
             count = min(len(ranked), config.DAILY_COUNT)
+            top = ranked[:count]
             
-            for job, score, matched in ranked[:count]:
-                # Cache job
-                self.db.upsert_job(job)
-                job_id = job.get('id')
-                
-                # Log as shown
-                self.db.log_interaction(user_id, job_id, 'shown')
-                
-                # Format message
-                explanation = None
-                if matched:
-                    explanation = f"Matched: {', '.join(matched[:3])}"
-                
-                message = self.job_bot.format_job_message(job, explanation)
-                keyboard = self.job_bot.create_job_keyboard(job_id)
-                
+            # Cache jobs and log them as shown in one commit (in a worker thread, off the event loop)
+            await asyncio.to_thread(self.job_bot.record_shown_jobs, user_id, [job for job, _, _ in top], 'DIGEST')
+            
+            # Format messages in a worker thread (uncached descriptions are HTML-parsed)
+            cards = await asyncio.to_thread(self.job_bot.build_job_cards, [
+                (job, f"Matched: {', '.join(matched[:3])}" if matched else None)
+                for job, score, matched in top
+            ])
+            for message, keyboard in cards:
                 # Send job
                 await bot.send_message(
                     chat_id=user_id,
@@ -161,61 +171,77 @@ class DigestScheduler:
             
             # Next digest already advanced by reservation (DB-level update). No action required here.
             
-        except Exception as e:
-            print(f"Error sending digest to user {user_id}: {e}")
+        except Exception:
+            logger.exception("[DIGEST] Error sending digest to user %s", user_id)
     
+    async def _send_digests(self, bot: Bot, users: List[Dict]):
+        """Send digests to users concurrently, bounded by DIGEST_CONCURRENCY so we stay within
+        Telegram's global rate limits; each user's own messages are still sent sequentially in order."""
+        semaphore = asyncio.Semaphore(max(config.DIGEST_CONCURRENCY, 1))
+
+        async def _send(user):
+            async with semaphore:
+                await self.send_digest_to_user(bot, user)
+
+        await asyncio.gather(*(_send(user) for user in users), return_exceptions=True)
+
     async def run_digest_job(self):
         """Run digest job - send to all eligible users."""
-        print("Running daily digest job...")
+        logger.info("[DIGEST] Running daily digest job...")
         
         # Reserve users due for digest atomically and advance their next_digest_at
-        now_iso = datetime.now(timezone(config.DEFAULT_TIMEZONE)).isoformat()
-        users = self.db.reserve_due_users_for_digest(now_iso)
+        now_iso = datetime.now(config.TZ).isoformat()
+        users = await asyncio.to_thread(self.db.reserve_due_users_for_digest, now_iso)
         
         if not users:
-            print("No users due for digest")
+            logger.info("[DIGEST] No users due for digest")
             return
         
-        print(f"Sending digest to {len(users)} users")
-        
-        # Create bot instance
-        bot = Bot(token=config.TELEGRAM_BOT_TOKEN)
+        logger.info("[DIGEST] Sending digest to %d users", len(users))
+        # Load every due user's keywords in one query so the per-user lookups hit the keyword cache
+        await asyncio.to_thread(self.db.prime_keyword_cache, [user['user_id'] for user in users])
 
         # Determine today's encouragement message (single message for all users)
         encouragement_msg = None
         if config.ENCOURAGEMENT_ENABLED:
-            today_date = datetime.now(timezone(config.DEFAULT_TIMEZONE)).date().isoformat()
-            encouragement_msg = self.db.get_daily_cache('encouragement_message', today_date)
+            today_date = datetime.now(config.TZ).date().isoformat()
+            encouragement_msg = await asyncio.to_thread(self.db.get_daily_cache, 'encouragement_message', today_date)
             if not encouragement_msg:
                 # Generate new encouragement and cache it
                 try:
                     llm = get_llm_service()
-                    encouragement_msg = llm.generate_encouragement()
+                    encouragement_msg = await asyncio.to_thread(llm.generate_encouragement)
                     if encouragement_msg:
-                        self.db.set_daily_cache('encouragement_message', encouragement_msg, today_date)
+                        await asyncio.to_thread(self.db.set_daily_cache, 'encouragement_message', encouragement_msg, today_date)
                 except Exception as e:
                     logger.warning("Failed to generate encouragement message: %s", e)
                     encouragement_msg = None
         
-        # Send to each user (attach encouragement message to the user payload so send_digest_to_user can read it)
+        # Attach encouragement message to the user payload so send_digest_to_user can read it
         for user in users:
             user['encouragement'] = encouragement_msg
-            await self.send_digest_to_user(bot, user)
-            # Delay between users to avoid rate limits
-            await asyncio.sleep(1)
+        if self._telegram_bot is not None:
+            await self._send_digests(self._telegram_bot, users)
+        else:
+            # Standalone run (e.g. `python main.py digest`): the bot lives for this run's event loop only
+            async with self._create_telegram_bot() as bot:
+                await self._send_digests(bot, users)
         
-        print("Digest job completed")
+        logger.info("[DIGEST] Digest job completed")
 
 
 # Global scheduler instance
 _scheduler = None
+_scheduler_lock = threading.Lock()
 _apscheduler = None
 
 def get_scheduler() -> DigestScheduler:
-    """Get global scheduler instance."""
+    """Get global scheduler instance (created once, thread-safe)."""
     global _scheduler
     if _scheduler is None:
-        _scheduler = DigestScheduler()
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = DigestScheduler()
     return _scheduler
 
 
@@ -232,6 +258,9 @@ def start_background_scheduler(application=None):
     """
     logger.info("Starting background scheduler (self-scheduling)")
     global _apscheduler
+    if application is not None:
+        # Digests share the application's bot, so its AIORateLimiter paces them together with replies
+        get_scheduler().use_bot(application.bot)
     scheduler = AsyncIOScheduler(timezone=config.SCHEDULER_TZ)
 
     # Job listener for logging
@@ -261,7 +290,7 @@ def start_background_scheduler(application=None):
     if config.ENCOURAGEMENT_ENABLED:
         try:
             scheduler_instance = get_scheduler()
-            today_date = datetime.now(timezone(config.DEFAULT_TIMEZONE)).date().isoformat()
+            today_date = datetime.now(config.TZ).date().isoformat()
             cache_value = scheduler_instance.db.get_daily_cache('encouragement_message', today_date)
             if not cache_value:
                 llm = get_llm_service()
@@ -133,8 +133,8 @@ def check_apis():
             print(f"  ✗ FindSGJobs endpoint error: {resp.status_code}")
             return False
     except Exception as e:
-        print(f"  ✗ Adzuna error: {e}")
-        print("    Check your ADZUNA credentials")
+        print(f"  ✗ FindSGJobs error: {e}")
+        print("    Check your FINDSGJOBS_API_ENDPOINT")
         return False
     
     # Check OpenAI